@@ -0,0 +1,226 @@
+import numpy as np
+from collections import namedtuple
+
+# Alarm priorities, highest first when events are reported
+LOW, MEDIUM, HIGH = 1, 2, 3
+PRIORITY_NAMES = {LOW: "low", MEDIUM: "medium", HIGH: "high"}
+
+# raised is True when the alarm starts and False when it clears
+AlarmEvent = namedtuple("AlarmEvent", "time patient rule priority raised message")
+
+
+class AlarmRule:
+    name = "alarm"
+
+    def __init__(self, priority=MEDIUM, delay=0.0):
+        """Base class for alarm rules
+
+        A rule keeps per-patient state in arrays. beat() is called once per
+        detected beat and condition() once per tick; both must be O(1) per
+        patient. The condition has to hold for `delay` seconds before the
+        engine raises the alarm.
+        """
+        self.priority = priority
+        self.delay = delay
+
+    def reset(self, num_patients):
+        """Allocate per-patient state"""
+
+    def beat(self, patient, time, rr, st_level):
+        """Update state for one beat (rr and st_level may be NaN)"""
+
+    def condition(self, now, heart_rates):
+        """Boolean array: patients currently violating the rule"""
+        raise NotImplementedError
+
+    def describe(self, patient, heart_rates):
+        """Message for an event on one patient"""
+        return self.name
+
+
+class HeartRateHigh(AlarmRule):
+    name = "HR high"
+
+    def __init__(self, limit=120, priority=MEDIUM, delay=5.0):
+        super().__init__(priority, delay)
+        self.limit = limit
+
+    def condition(self, now, heart_rates):
+        return heart_rates > self.limit
+
+    def describe(self, patient, heart_rates):
+        return f"HR {heart_rates[patient]:.0f} > {self.limit}"
+
+
+class HeartRateLow(AlarmRule):
+    name = "HR low"
+
+    def __init__(self, limit=50, priority=MEDIUM, delay=5.0):
+        super().__init__(priority, delay)
+        self.limit = limit
+
+    def condition(self, now, heart_rates):
+        return heart_rates < self.limit
+
+    def describe(self, patient, heart_rates):
+        return f"HR {heart_rates[patient]:.0f} < {self.limit}"
+
+
+class Asystole(AlarmRule):
+    name = "Asystole"
+
+    def __init__(self, timeout=4.0, priority=HIGH):
+        super().__init__(priority, 0.0)
+        self.timeout = timeout
+
+    def reset(self, num_patients):
+        self.last_beat = np.full(num_patients, np.nan)
+
+    def beat(self, patient, time, rr, st_level):
+        self.last_beat[patient] = time
+
+    def condition(self, now, heart_rates):
+        # Patients without any beat yet are timed from the start
+        last_beat = np.where(np.isnan(self.last_beat), 0.0, self.last_beat)
+        return now - last_beat > self.timeout
+
+    def describe(self, patient, heart_rates):
+        return f"No beat for over {self.timeout:.0f} s"
+
+
+class TachyRun(AlarmRule):
+    name = "Tachy run"
+
+    def __init__(self, rate=100, beats=4, priority=HIGH):
+        """Alarm on `beats` or more consecutive beats faster than `rate`"""
+        super().__init__(priority, 0.0)
+        self.rate = rate
+        self.beats = beats
+
+    def reset(self, num_patients):
+        self.run = np.zeros(num_patients, dtype=np.int64)
+
+    def beat(self, patient, time, rr, st_level):
+        if rr > 0 and 60.0 / rr > self.rate:
+            self.run[patient] += 1
+        elif rr == rr:
+            self.run[patient] = 0
+
+    def condition(self, now, heart_rates):
+        return self.run >= self.beats
+
+    def describe(self, patient, heart_rates):
+        return f"Run of {self.run[patient]} beats > {self.rate} BPM"
+
+
+class STShift(AlarmRule):
+    name = "ST shift"
+
+    def __init__(self, limit=0.2, beats=16, priority=MEDIUM, delay=10.0):
+        """Alarm when the mean ST level over the last `beats` beats exceeds
+        +/- limit mV"""
+        super().__init__(priority, delay)
+        self.limit = limit
+        self.beats = beats
+
+    def reset(self, num_patients):
+        # Running window per patient: ring of the last values plus their sum
+        self.values = np.zeros((num_patients, self.beats))
+        self.count = np.zeros(num_patients, dtype=np.int64)
+        self.total = np.zeros(num_patients)
+
+    def beat(self, patient, time, rr, st_level):
+        if st_level != st_level:
+            return
+        slot = self.count[patient] % self.beats
+        self.total[patient] += st_level - self.values[patient, slot]
+        self.values[patient, slot] = st_level
+        self.count[patient] += 1
+
+    def mean(self):
+        return self.total / np.maximum(1, np.minimum(self.count, self.beats))
+
+    def condition(self, now, heart_rates):
+        return (self.count >= self.beats) & (np.abs(self.mean()) > self.limit)
+
+    def describe(self, patient, heart_rates):
+        return f"ST {self.mean()[patient]:+.2f} mV"
+
+
+def default_rules():
+    """Rule set used when none is given"""
+    return [Asystole(), TachyRun(), HeartRateHigh(), HeartRateLow(), STShift()]
+
+
+class AlarmEngine:
+    def __init__(self, num_patients=1, rules=None):
+        """Evaluate alarm rules for many patients from beats and heart rates
+
+        Beats update rule state as they are reported; update() then checks
+        every rule with one vectorized comparison per rule, so the cost of
+        a tick depends on the number of patients, never on buffer lengths.
+        Returns raised/cleared events, highest priority first.
+        """
+        self.num_patients = num_patients
+        self.rules = rules if rules is not None else default_rules()
+        for rule in self.rules:
+            rule.reset(num_patients)
+
+        self.last_beat = np.full(num_patients, np.nan)
+        # When each rule's condition started holding (NaN while it doesn't)
+        self.onset = np.full((len(self.rules), num_patients), np.nan)
+        self.active = np.zeros((len(self.rules), num_patients), dtype=bool)
+
+    def beat(self, patient, time, st_level=np.nan):
+        """Report one detected beat (time in seconds)"""
+        rr = time - self.last_beat[patient]
+        self.last_beat[patient] = time
+        for rule in self.rules:
+            rule.beat(patient, time, rr, st_level)
+
+    def beats(self, patients, times, st_levels=None):
+        """Report several beats, in time order per patient"""
+        if st_levels is None:
+            st_levels = np.full(len(times), np.nan)
+        for patient, time, st_level in zip(patients, times, st_levels):
+            self.beat(int(patient), float(time), float(st_level))
+
+    def peaks(self, peaks, sample_rate):
+        """Report per-patient R-peak index arrays (as PanTompkinsDetector returns)"""
+        for patient, indices in enumerate(peaks):
+            for index in indices:
+                self.beat(patient, index / sample_rate)
+
+    def update(self, now, heart_rates):
+        """Evaluate all rules at time `now`, return new AlarmEvents"""
+        heart_rates = np.broadcast_to(
+            np.asarray(heart_rates, dtype=np.float64), (self.num_patients,))
+        events = []
+        for r, rule in enumerate(self.rules):
+            holding = rule.condition(now, heart_rates)
+            onset = self.onset[r]
+            onset[holding & np.isnan(onset)] = now
+            onset[~holding] = np.nan
+            active = holding & (now - onset >= rule.delay)
+
+            changed = np.flatnonzero(active != self.active[r])
+            for patient in changed:
+                raised = bool(active[patient])
+                message = rule.describe(patient, heart_rates) if raised else f"{rule.name} cleared"
+                events.append(AlarmEvent(now, int(patient), rule.name, rule.priority,
+                                         raised, message))
+            self.active[r] = active
+
+        events.sort(key=lambda event: -event.priority)
+        return events
+
+    def highest_priority(self):
+        """Per-patient priority of the most severe active alarm (0 if none)"""
+        priorities = np.array([rule.priority for rule in self.rules])[:, None]
+        return (self.active * priorities).max(axis=0, initial=0)
+
+    def active_alarms(self, patient=0):
+        """(rule name, priority) of a patient's active alarms, most severe first"""
+        alarms = [(rule.name, rule.priority) for r, rule in enumerate(self.rules)
+                  if self.active[r, patient]]
+        return sorted(alarms, key=lambda alarm: -alarm[1])
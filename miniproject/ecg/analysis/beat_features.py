@@ -0,0 +1,186 @@
+import numpy as np
+from collections import deque
+from utils.ring_buffer import GrowableArray, RingBuffer
+
+# One row per analysed beat; intervals in seconds, levels in mV.
+# Measurements that could not be made are NaN.
+BEAT_DTYPE = np.dtype([
+    ("sample", "<i8"),        # Absolute sample index of the R peak
+    ("time", "<f8"),          # Seconds since the first sample
+    ("rr", "<f4"),            # Interval from the previous beat
+    ("r_amplitude", "<f4"),   # R peak above the isoelectric level
+    ("qrs_width", "<f4"),
+    ("pr", "<f4"),            # P onset to QRS onset
+    ("qt", "<f4"),            # QRS onset to T end
+    ("st_level", "<f4"),      # Deviation at J point + st_offset
+])
+
+
+class BeatTable(GrowableArray):
+    def __init__(self, capacity=4096):
+        """Beat feature rows (BEAT_DTYPE), ordered by sample"""
+        super().__init__(BEAT_DTYPE, capacity)
+
+
+class BeatAnalyzer:
+    def __init__(self, sample_rate, before=0.35, after=0.6, st_offset=0.06,
+                 refractory=0.2, capacity=4096):
+        """Per-beat interval and ST measurement over a fixed window
+
+        Samples and detected R peaks are fed as they arrive. A beat is
+        measured once `after` seconds have followed its peak, looking only
+        at the window [peak - before, peak + after], so each beat costs the
+        same regardless of how long the session has run. Results go into
+        a BeatTable. A beat whose refined R peak falls within `refractory`
+        seconds of the previous one is a duplicate detection and is dropped.
+        """
+        self.sample_rate = sample_rate
+        self.before = int(round(before * sample_rate))
+        self.after = int(round(after * sample_rate))
+        self.st_offset = int(round(st_offset * sample_rate))
+        self.refractory = int(round(refractory * sample_rate))
+
+        # Enough history to cover a full window behind the newest sample
+        self.history = RingBuffer(self.before + self.after + int(sample_rate))
+        self.samples_seen = 0
+        self.pending = deque()
+        self.last_r = None
+        self.beats = BeatTable(capacity)
+
+        # 20 ms smoothing before taking slopes
+        self.smooth_kernel = np.full(max(1, int(round(0.02 * sample_rate))), 1.0)
+        self.smooth_kernel /= len(self.smooth_kernel)
+        self.flat_run = max(2, int(round(0.02 * sample_rate)))
+
+    def process(self, samples, peaks):
+        """Feed new samples and the R peaks detected in them
+
+        Returns the rows added by this call.
+        """
+        samples = np.asarray(samples, dtype=np.float32).ravel()
+        self.history.extend(samples)
+        self.samples_seen += len(samples)
+        self.pending.extend(int(p) for p in np.atleast_1d(peaks))
+
+        first_row = len(self.beats)
+        oldest = max(0, self.samples_seen - self.history.capacity)
+        while self.pending and self.pending[0] + self.after < self.samples_seen:
+            peak = self.pending.popleft()
+            if peak - self.before >= oldest:
+                self._measure(peak)
+        return self.beats.rows()[first_row:]
+
+    def _window(self, peak):
+        """Samples [peak - before, peak + after] from the history"""
+        end = peak + self.after + 1
+        view = self.history.view(self.samples_seen - (peak - self.before))
+        return view[:end - (peak - self.before)].astype(np.float64)
+
+    def _find_flat(self, slope, start, stop, step, threshold):
+        """First index from start toward stop that begins a run of low slope
+
+        The run only counts once a steep stretch has been crossed, so the
+        flat top of the R wave itself is skipped.
+        """
+        run = 0
+        steep = False
+        for i in range(start, stop, step):
+            steep = steep or abs(slope[i]) >= threshold
+            run = run + 1 if steep and abs(slope[i]) < threshold else 0
+            if run >= self.flat_run:
+                return i - step * (self.flat_run - 1)
+        return None
+
+    def _measure(self, peak):
+        """Delineate one beat and append its row"""
+        fs = self.sample_rate
+        x = np.convolve(self._window(peak), self.smooth_kernel, mode="same")
+        slope = np.gradient(x)
+        nan = np.nan
+
+        # Refine the R peak to the largest deflection near the detection
+        search = int(0.1 * fs)
+        center = self.before
+        local = x[center - search:center + search + 1]
+        r = center - search + int(np.argmax(np.abs(local - np.median(x))))
+        peak += r - center
+        if self.last_r is not None and peak - self.last_r < self.refractory:
+            return
+
+        # QRS onset/offset: the nearest flat runs outside the steep complex
+        qrs_slope = np.abs(slope[max(0, r - search):r + search + 1]).max()
+        threshold = 0.08 * qrs_slope
+        onset = self._find_flat(slope, r, max(0, r - int(0.15 * fs)), -1, threshold)
+        offset = self._find_flat(slope, r, min(len(x), r + int(0.15 * fs)), 1, threshold)
+
+        rr = nan
+        if self.last_r is not None:
+            rr = (peak - self.last_r) / fs
+        self.last_r = peak
+
+        r_amplitude = qrs_width = pr = qt = st_level = nan
+        if onset is not None and offset is not None:
+            qrs_width = (offset - onset) / fs
+            iso_start = max(0, onset - int(0.02 * fs))
+            isoelectric = x[iso_start:onset + 1].mean()
+            r_amplitude = x[r] - isoelectric
+
+            st_offset = self.st_offset
+            if rr == rr:
+                # Stay ahead of the T wave at fast rates
+                st_offset = min(st_offset, int(0.15 * rr * fs))
+            st_point = offset + st_offset
+            if st_point < len(x):
+                st_level = x[st_point] - isoelectric
+
+            pr = self._pr_interval(x, onset, isoelectric, r_amplitude, rr)
+            qt = self._qt_interval(x, slope, onset, offset, isoelectric, rr)
+
+        self.beats.append((peak, peak / fs, rr, r_amplitude, qrs_width, pr, qt, st_level))
+
+    def _pr_interval(self, x, onset, isoelectric, r_amplitude, rr):
+        """P onset to QRS onset, NaN when no P wave stands out"""
+        fs = self.sample_rate
+        reach = 0.3
+        if rr == rr:
+            # Stay clear of the previous T wave at fast rates
+            reach = min(reach, 0.45 * rr)
+        first = max(0, onset - int(reach * fs))
+        last = onset - int(0.04 * fs)
+        if last <= first:
+            return np.nan
+        deviation = np.abs(x[first:last] - isoelectric)
+        p_peak = first + int(np.argmax(deviation))
+        p_amplitude = deviation[p_peak - first]
+        if p_amplitude < 0.05 * abs(r_amplitude):
+            return np.nan
+
+        # Walk back from the P peak until the wave has returned to baseline
+        below = np.flatnonzero(deviation[:p_peak - first] < 0.1 * p_amplitude)
+        p_onset = first + (int(below[-1]) if len(below) else 0)
+        return (onset - p_onset) / fs
+
+    def _qt_interval(self, x, slope, onset, offset, isoelectric, rr):
+        """QRS onset to T end (tangent method), NaN when no T wave is found"""
+        fs = self.sample_rate
+        first = offset + int(0.06 * fs)
+        limit = self.before + self.after
+        if rr == rr:
+            # Stay clear of the next beat at fast rates
+            limit = min(limit, self.before + int(0.7 * rr * fs))
+        if limit - first < 3:
+            return np.nan
+
+        deviation = x[first:limit] - isoelectric
+        t_peak = first + int(np.argmax(np.abs(deviation)))
+        if t_peak >= limit - 1:
+            return np.nan
+
+        # Steepest return toward baseline after the T peak
+        sign = np.sign(x[t_peak] - isoelectric)
+        descent = sign * slope[t_peak:limit]
+        steepest = t_peak + int(np.argmin(descent))
+        if slope[steepest] == 0 or sign * slope[steepest] >= 0:
+            return np.nan
+        t_end = steepest + (isoelectric - x[steepest]) / slope[steepest]
+        return (t_end - onset) / fs
@@ -0,0 +1,149 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class StreamingFIR:
+    def __init__(self, kernel, channels=1):
+        """FIR filter applied block by block to (channels, samples) arrays
+
+        The last len(kernel) - 1 input samples of each channel are kept
+        between calls, so filtering a signal in chunks gives the same
+        output as filtering it in one go.
+        """
+        self.kernel = np.asarray(kernel, dtype=np.float64)
+        self.channels = channels
+        # Reversed once so a sliding window dot product is a convolution
+        self.reversed_kernel = self.kernel[::-1].copy()
+        self.state = np.zeros((channels, len(self.kernel) - 1))
+
+    @property
+    def delay(self):
+        """Group delay in samples (exact for symmetric kernels)"""
+        return (len(self.kernel) - 1) / 2.0
+
+    def process(self, x):
+        """Filter a (channels, n) block, return a (channels, n) block"""
+        x = np.asarray(x, dtype=np.float64)
+        extended = np.concatenate((self.state, x), axis=1)
+        if self.state.shape[1]:
+            self.state = extended[:, -self.state.shape[1]:].copy()
+        windows = sliding_window_view(extended, len(self.kernel), axis=1)
+        return windows @ self.reversed_kernel
+
+    def reset(self):
+        """Clear filter history"""
+        self.state.fill(0.0)
+
+
+def moving_average_kernel(length):
+    """Boxcar kernel with unit DC gain"""
+    length = max(1, int(length))
+    return np.full(length, 1.0 / length)
+
+
+def _biquad(b, a):
+    """Normalize (b0, b1, b2), (a0, a1, a2) to one second-order section row"""
+    b = np.asarray(b, dtype=np.float64) / a[0]
+    a = np.asarray(a, dtype=np.float64) / a[0]
+    return np.concatenate((b, a))
+
+
+def highpass_section(cutoff, sample_rate, q=1 / np.sqrt(2)):
+    """Second-order high-pass (RBJ cookbook)"""
+    w0 = 2 * np.pi * cutoff / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    return _biquad(((1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2),
+                   (1 + alpha, -2 * cos_w0, 1 - alpha))
+
+
+def lowpass_section(cutoff, sample_rate, q=1 / np.sqrt(2)):
+    """Second-order low-pass (RBJ cookbook)"""
+    w0 = 2 * np.pi * cutoff / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    return _biquad(((1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2),
+                   (1 + alpha, -2 * cos_w0, 1 - alpha))
+
+
+def notch_section(frequency, sample_rate, q=30.0):
+    """Second-order notch (RBJ cookbook); q sets the notch width"""
+    w0 = 2 * np.pi * frequency / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    return _biquad((1, -2 * cos_w0, 1), (1 + alpha, -2 * cos_w0, 1 - alpha))
+
+
+def ecg_filter_sections(sample_rate, highpass=0.5, mains=50.0, lowpass=40.0):
+    """(sections, 6) chain of baseline-wander high-pass, mains notch and low-pass
+
+    Any stage can be disabled with None. The notch and low-pass are
+    skipped when their frequency is at or above Nyquist.
+    """
+    nyquist = sample_rate / 2.0
+    sections = []
+    if highpass:
+        sections.append(highpass_section(highpass, sample_rate))
+    if mains and mains < nyquist:
+        sections.append(notch_section(mains, sample_rate))
+    if lowpass and lowpass < nyquist:
+        sections.append(lowpass_section(lowpass, sample_rate))
+    return np.array(sections).reshape(-1, 6)
+
+
+class StreamingSOS:
+    def __init__(self, sections, channels=1, chunk=64):
+        """Cascade of second-order IIR sections applied block by block
+
+        Each section is run in closed form over chunks of up to `chunk`
+        samples: with the section's state-space (A, B, C, D), a chunk's
+        output is x @ H + s @ O and its final state s @ A^L + x @ G, where
+        H holds the impulse response, so the per-sample recursion becomes
+        a few small matrix products vectorized over channels. State is
+        kept between calls, so chunked filtering matches one-shot
+        filtering to rounding error.
+        """
+        self.sections = np.atleast_2d(np.asarray(sections, dtype=np.float64))
+        self.channels = channels
+        self.chunk = chunk
+        self.state = np.zeros((len(self.sections), channels, 2))
+        self.matrices = [self._chunk_matrices(section, chunk) for section in self.sections]
+
+    @staticmethod
+    def _chunk_matrices(section, length):
+        """Precomputed (H, O, G, powers of A) for one section"""
+        b0, b1, b2, _, a1, a2 = section
+        # Transposed direct form II: y = b0 x + z1
+        a = np.array([[-a1, 1.0], [-a2, 0.0]])
+        b = np.array([b1 - a1 * b0, b2 - a2 * b0])
+        c = np.array([1.0, 0.0])
+
+        powers = [np.eye(2)]
+        for _ in range(length):
+            powers.append(a @ powers[-1])
+        powers = np.array(powers)                            # A^0 .. A^length
+
+        observe = np.einsum("j,kji->ki", c, powers[:length])  # Row k: C A^k
+        response = np.concatenate(([b0], observe[:-1] @ b))  # h[0] = D, h[k] = C A^(k-1) B
+        lag = np.arange(length)[None, :] - np.arange(length)[:, None]
+        impulse = np.where(lag >= 0, response[np.clip(lag, 0, None)], 0.0)
+        # Row j: (A^(length-1-j) B), the input's contribution to the end state
+        gather = powers[length - 1::-1] @ b
+        return impulse, observe.T.copy(), gather, powers
+
+    def process(self, x):
+        """Filter a (channels, n) block, return a (channels, n) block"""
+        y = np.array(x, dtype=np.float64).reshape(self.channels, -1)
+        n = y.shape[1]
+        for state, (impulse, observe, gather, powers) in zip(self.state, self.matrices):
+            for start in range(0, n, self.chunk):
+                length = min(self.chunk, n - start)
+                block = y[:, start:start + length]
+                s = state.copy()
+                state[:] = s @ powers[length].T + block @ gather[self.chunk - length:]
+                block[:] = block @ impulse[:length, :length] + s @ observe[:, :length]
+        return y
+
+    def reset(self):
+        """Clear filter history"""
+        self.state.fill(0.0)
@@ -0,0 +1,145 @@
+import numpy as np
+from utils.ring_buffer import GrowableArray
+
+
+# One row per accepted RR interval (seconds), ending at `time`.
+# after_break marks an interval that does not follow on from the one
+# before (an artefact between them was left out).
+RR_DTYPE = np.dtype([("time", "<f8"), ("rr", "<f8"), ("after_break", "?")])
+
+
+class RRSeries(GrowableArray):
+    def __init__(self, capacity=4096):
+        """Every accepted RR interval of the session, ordered by time"""
+        super().__init__(RR_DTYPE, capacity)
+
+    @property
+    def times(self):
+        return self.records["time"]
+
+    @property
+    def intervals(self):
+        return self.records["rr"]
+
+    @property
+    def breaks(self):
+        return self.records["after_break"]
+
+    def append(self, time, rr, after_break=False):
+        """Append one interval (seconds) ending at `time`"""
+        super().append((time, rr, after_break))
+
+
+class RollingHRV:
+    def __init__(self, series, seconds):
+        """Time-domain HRV over the last `seconds` of an RRSeries
+
+        Mean and variance of RR use Welford updates, with the inverse update
+        when an interval leaves the window; successive differences keep a
+        running sum of squares and a count above 50 ms, over adjacent pairs
+        only (none across a break in the series). Every interval
+        enters and leaves exactly once, so the cost per beat is constant
+        however long the session runs.
+        """
+        self.series = series
+        self.seconds = seconds
+        self.first = 0        # Series index of the oldest interval in the window
+        self.next = 0         # Series index of the next interval to take in
+
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.diff_count = 0
+        self.diff_squares = 0.0
+        self.nn50 = 0
+
+    def _diff(self, i):
+        """Successive difference between interval i - 1 and i (seconds)"""
+        return self.series.intervals[i] - self.series.intervals[i - 1]
+
+    def _has_diff(self, i):
+        """True if interval i and i - 1 are both in the window and adjacent"""
+        return self.first < i < self.next and not self.series.breaks[i]
+
+    def update(self, now):
+        """Take in new intervals and drop those older than the window"""
+        while self.next < len(self.series):
+            rr = self.series.intervals[self.next]
+            self.count += 1
+            delta = rr - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (rr - self.mean)
+            self.next += 1
+            if self._has_diff(self.next - 1):
+                self._add_diff(self._diff(self.next - 1), 1)
+
+        oldest = now - self.seconds
+        while self.first < self.next and self.series.times[self.first] < oldest:
+            rr = self.series.intervals[self.first]
+            self.count -= 1
+            if self.count:
+                delta = rr - self.mean
+                self.mean -= delta / self.count
+                self.m2 -= delta * (rr - self.mean)
+            else:
+                self.mean = self.m2 = 0.0
+            if self._has_diff(self.first + 1):
+                self._add_diff(self._diff(self.first + 1), -1)
+            self.first += 1
+
+    def _add_diff(self, diff, sign):
+        self.diff_count += sign
+        self.diff_squares += sign * diff * diff
+        self.nn50 += sign * int(abs(diff) > 0.05)
+
+    def metrics(self):
+        """SDNN and RMSSD (ms), pNN50 (%) and mean HR (BPM); NaN when too few beats"""
+        sdnn = rmssd = pnn50 = mean_hr = np.nan
+        if self.count:
+            mean_hr = 60.0 / float(self.mean)
+        if self.count > 1:
+            sdnn = 1000.0 * float(np.sqrt(max(0.0, self.m2) / (self.count - 1)))
+        if self.diff_count:
+            rmssd = 1000.0 * float(np.sqrt(max(0.0, self.diff_squares) / self.diff_count))
+            pnn50 = 100.0 * self.nn50 / self.diff_count
+        return {"count": self.count, "sdnn": sdnn, "rmssd": rmssd,
+                "pnn50": pnn50, "mean_hr": mean_hr}
+
+
+class HRVTracker:
+    def __init__(self, windows=(60, 300, 3600), min_rr=0.3, max_rr=2.0):
+        """Persistent RR series with rolling HRV over several windows
+
+        windows are in seconds (1, 5 and 60 minutes by default). Intervals
+        outside [min_rr, max_rr] seconds are treated as artefacts and kept
+        out of the series, leaving a break there.
+        """
+        self.series = RRSeries()
+        self.min_rr = min_rr
+        self.max_rr = max_rr
+        self.windows = {seconds: RollingHRV(self.series, seconds) for seconds in windows}
+        self.now = 0.0
+        self.after_break = False
+
+    def extend(self, times, intervals):
+        """Add RR intervals (seconds) ending at the given beat times"""
+        for time, rr in zip(times, intervals):
+            if self.min_rr <= rr <= self.max_rr:
+                self.series.append(float(time), float(rr), self.after_break)
+                self.after_break = False
+            else:
+                self.after_break = True
+            self.now = max(self.now, float(time))
+
+    def update(self, now=None):
+        """Advance every window to `now` (default: the newest beat)"""
+        if now is not None:
+            self.now = max(self.now, now)
+        for window in self.windows.values():
+            window.update(self.now)
+
+    def metrics(self, seconds=300):
+        """Metrics of one window"""
+        window = self.windows[seconds]
+        window.update(self.now)
+        return window.metrics()
@@ -0,0 +1,214 @@
+import numpy as np
+from collections import deque
+from analysis.filters import StreamingFIR, moving_average_kernel
+
+
+def bandpass_kernel(sample_rate):
+    """Pan-Tompkins 5-15 Hz bandpass (integer low-pass + high-pass) as one FIR
+
+    The original filters are defined at 200 Hz; the delay lengths are
+    scaled to the given sample rate.
+    """
+    # Low-pass: (1 - z^-m)^2 / (1 - z^-1)^2 == two cascaded m-point boxcars
+    m = max(2, int(round(0.030 * sample_rate)))
+    low_pass = np.convolve(moving_average_kernel(m), moving_average_kernel(m))
+
+    # High-pass: delayed input minus a moving average (all-pass - low-pass)
+    n = max(4, int(round(0.160 * sample_rate)))
+    n += n % 2
+    high_pass = -moving_average_kernel(n)
+    high_pass[n // 2] += 1.0
+
+    return np.convolve(low_pass, high_pass)
+
+
+def derivative_kernel(sample_rate):
+    """Five-point derivative, scaled to units per second"""
+    return np.array([1.0, 2.0, 0.0, -2.0, -1.0]) * (sample_rate / 8.0)
+
+
+class PanTompkinsDetector:
+    def __init__(self, sample_rate, channels=1, learning_period=2.0,
+                 refractory=0.2, t_wave_window=0.36, window=3.0, max_intervals=512):
+        """Streaming Pan-Tompkins QRS detector for one or more channels
+
+        Each block runs through bandpass, derivative, squaring and
+        moving-window integration (all FIR stages carrying state across
+        blocks, vectorized over channels). Peaks of the integrated signal
+        are classified against the adaptive SPKI/NPKI thresholds, with
+        searchback when an RR interval runs past 166% of the average.
+        A candidate within t_wave_window seconds of the previous QRS whose
+        maximum slope is under half of that QRS's is taken as a T wave. The
+        slope is measured on the input near the candidate rather than after
+        the bandpass, which at high rates leaves QRS and T slopes too close.
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.refractory = int(refractory * sample_rate)
+        self.t_wave_window = int(t_wave_window * sample_rate)
+        self.learning_samples = int(learning_period * sample_rate)
+        self.window_samples = int(window * sample_rate)
+
+        self.bandpass = StreamingFIR(bandpass_kernel(sample_rate), channels)
+        self.derivative = StreamingFIR(derivative_kernel(sample_rate), channels)
+        self.integrator = StreamingFIR(
+            moving_average_kernel(round(0.150 * sample_rate)), channels)
+
+        # Approximate lag between an R wave and its integrated-signal peak
+        self.delay = int(round(self.bandpass.delay + self.derivative.delay +
+                               self.integrator.delay))
+
+        self.samples_seen = 0
+        self.tail = np.zeros((channels, 2))   # For 3-point local maxima
+
+        # Input slope within +/- 50 ms of each candidate, for the T-wave check
+        self.slope = StreamingFIR(derivative_kernel(sample_rate), channels)
+        self.slope_reach = int(round(0.05 * sample_rate))
+        self.slope_offset = int(round(self.slope.delay)) - self.delay
+        self.slope_tail = np.zeros((channels, self.delay + self.slope_reach + 2))
+
+        # Learning phase statistics
+        self.learning_max = np.zeros(channels)
+        self.learning_sum = np.zeros(channels)
+        self.learning_slope = np.zeros(channels)
+
+        # Adaptive threshold state (per channel)
+        self.spki = np.zeros(channels)
+        self.npki = np.zeros(channels)
+        self.last_qrs = np.full(channels, -1, dtype=np.int64)
+        self.rr_average = np.zeros(channels)
+        self.searchback_value = np.zeros(channels)
+        self.searchback_index = np.zeros(channels, dtype=np.int64)
+        self.searchback_slope = np.zeros(channels)
+        self.qrs_slope = np.zeros(channels)
+
+        self.recent_rr = [deque(maxlen=8) for _ in range(channels)]
+        self.channel_rr_intervals = [deque(maxlen=max_intervals) for _ in range(channels)]
+
+    @property
+    def rr_intervals(self):
+        """RR intervals (seconds) of the first channel"""
+        return self.channel_rr_intervals[0]
+
+    def threshold(self, channel):
+        """Primary detection threshold on the integrated signal"""
+        return self.npki[channel] + 0.25 * (self.spki[channel] - self.npki[channel])
+
+    def process(self, samples):
+        """Feed a block of samples, return R-peak sample indices
+
+        samples is (n,) for a single channel or (channels, n). The result
+        is a 1-D index array for (n,) input, otherwise one array per channel.
+        Indices are absolute and corrected for the filter delay.
+        """
+        x = np.asarray(samples, dtype=np.float64)
+        single = x.ndim == 1
+        x = x.reshape(self.channels, -1)
+        n = x.shape[1]
+        peaks = [[] for _ in range(self.channels)]
+
+        if n:
+            integrated = self.integrator.process(
+                self.derivative.process(self.bandpass.process(x)) ** 2)
+            slopes = np.concatenate((self.slope_tail, np.abs(self.slope.process(x))), axis=1)
+            start = self.samples_seen
+            first_slope = start - self.slope_tail.shape[1]
+            self.slope_tail = slopes[:, -self.slope_tail.shape[1]:].copy()
+            self.samples_seen += n
+
+            if start < self.learning_samples:
+                self._learn(integrated, slopes[:, -n:], start)
+
+            data = np.concatenate((self.tail, integrated), axis=1)
+            self.tail = data[:, -2:].copy()
+
+            center = data[:, 1:-1]
+            channel_idx, position = np.nonzero(
+                (center > data[:, :-2]) & (center >= data[:, 2:]))
+            values = center[channel_idx, position]
+            # center[:, 0] is the sample just before this block
+            indices = position + start - 1
+
+            keep = indices >= self.learning_samples
+            channel_idx, indices, values = channel_idx[keep], indices[keep], values[keep]
+
+            # Steepest input slope around each candidate's delay-corrected position
+            centers = indices + self.slope_offset - first_slope
+            window = centers[:, None] + np.arange(-self.slope_reach, self.slope_reach + 1)
+            max_slopes = slopes[channel_idx[:, None], window].max(axis=1)
+
+            for c, i, value, slope in zip(channel_idx, indices, values, max_slopes):
+                self._classify(int(c), int(i), float(value), float(slope), peaks[int(c)])
+
+        result = [np.array(p, dtype=np.int64) - self.delay for p in peaks]
+        return result[0] if single else result
+
+    def _learn(self, integrated, slopes, start):
+        """Accumulate initial signal/noise levels during the learning period"""
+        count = min(integrated.shape[1], self.learning_samples - start)
+        segment = integrated[:, :count]
+        self.learning_max = np.maximum(self.learning_max, segment.max(axis=1))
+        self.learning_sum += segment.sum(axis=1)
+        self.learning_slope = np.maximum(self.learning_slope, slopes[:, :count].max(axis=1))
+
+        if start + count >= self.learning_samples:
+            self.spki = self.learning_max / 3.0
+            self.npki = self.learning_sum / self.learning_samples / 2.0
+            # Stands in for the previous QRS slope until the first beat
+            self.qrs_slope = self.learning_slope.copy()
+
+    def _classify(self, c, i, value, slope, peaks):
+        """Apply the adaptive thresholds to one integrated-signal peak"""
+        if self.last_qrs[c] >= 0 and i - self.last_qrs[c] < self.refractory:
+            return
+
+        # Searchback for a missed beat when the RR interval is overdue
+        if (self.rr_average[c] > 0 and
+                i - self.last_qrs[c] > 1.66 * self.rr_average[c] and
+                self.searchback_value[c] > 0.5 * self.threshold(c)):
+            self.spki[c] = 0.25 * self.searchback_value[c] + 0.75 * self.spki[c]
+            self._accept(c, int(self.searchback_index[c]), self.searchback_slope[c], peaks)
+            if i - self.last_qrs[c] < self.refractory:
+                return
+
+        if value > self.threshold(c) and not self._is_t_wave(c, i, slope):
+            self.spki[c] = 0.125 * value + 0.875 * self.spki[c]
+            self._accept(c, i, slope, peaks)
+        else:
+            self.npki[c] = 0.125 * value + 0.875 * self.npki[c]
+            if value > self.searchback_value[c] and not self._is_t_wave(c, i, slope):
+                self.searchback_value[c] = value
+                self.searchback_index[c] = i
+                self.searchback_slope[c] = slope
+
+    def _is_t_wave(self, c, i, slope):
+        """Shallow candidate soon after a QRS complex (or before the first one)"""
+        recent = self.last_qrs[c] < 0 or i - self.last_qrs[c] < self.t_wave_window
+        return recent and slope < 0.5 * self.qrs_slope[c]
+
+    def _accept(self, c, i, slope, peaks):
+        """Record a QRS complex at integrated-signal index i"""
+        if self.last_qrs[c] >= 0:
+            rr = i - self.last_qrs[c]
+            self.recent_rr[c].append(rr)
+            self.rr_average[c] = sum(self.recent_rr[c]) / len(self.recent_rr[c])
+            self.channel_rr_intervals[c].append(rr / self.sample_rate)
+        self.last_qrs[c] = i
+        self.qrs_slope[c] = slope
+        self.searchback_value[c] = 0.0
+        peaks.append(i)
+
+    def heart_rates(self):
+        """Per-channel heart rate in BPM (NaN where no recent beats)"""
+        rates = np.full(self.channels, np.nan)
+        recent = ((self.rr_average > 0) &
+                  (self.samples_seen - self.last_qrs <= self.window_samples))
+        rates[recent] = 60.0 * self.sample_rate / self.rr_average[recent]
+        return rates
+
+    def heart_rate(self, default=None):
+        """Heart rate of the first channel, same contract as StreamingPeakDetector"""
+        rate = self.heart_rates()[0]
+        if np.isnan(rate):
+            return default
+        return int(np.clip(rate, 30, 200))
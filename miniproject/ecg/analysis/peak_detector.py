@@ -0,0 +1,76 @@
+import numpy as np
+from collections import deque
+
+
+class StreamingPeakDetector:
+    def __init__(self, sample_rate, threshold=0.6, min_distance=0.4, window=3.0,
+                 max_intervals=512):
+        """Incremental R-peak detector that only inspects newly appended samples
+
+        A peak is a sample above threshold that is a strict maximum over its
+        +/-2 sample neighbourhood, at least min_distance seconds after the
+        previous peak. Heart rate is averaged over peaks in the last `window`
+        seconds.
+        """
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.min_distance = int(min_distance * sample_rate)
+        self.window_samples = int(window * sample_rate)
+
+        # Last 4 samples carried over so a local max can straddle blocks
+        self.tail = np.zeros(4, dtype=np.float32)
+        self.tail_start = -4          # Absolute index of tail[0]
+        self.samples_seen = 0
+
+        self.last_peak = None
+        self.recent_peaks = deque()                        # Absolute sample indices
+        self.rr_intervals = deque(maxlen=max_intervals)    # Seconds
+
+    def process(self, samples):
+        """Scan a block of new samples, return absolute indices of new peaks"""
+        samples = np.asarray(samples, dtype=np.float32).ravel()
+        if len(samples) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        data = np.concatenate((self.tail, samples))
+        base = self.tail_start
+        self.samples_seen += len(samples)
+        self.tail = data[-4:].copy()
+        self.tail_start = base + len(data) - 4
+
+        center = data[2:-2]
+        candidates = np.flatnonzero(
+            (center > self.threshold) &
+            (center > data[1:-3]) & (center > data[3:-1]) &
+            (center > data[:-4]) & (center > data[4:])
+        ) + 2 + base
+
+        new_peaks = []
+        for i in candidates:
+            i = int(i)
+            if self.last_peak is not None:
+                if i - self.last_peak < self.min_distance:
+                    continue
+                self.rr_intervals.append((i - self.last_peak) / self.sample_rate)
+            self.last_peak = i
+            self.recent_peaks.append(i)
+            new_peaks.append(i)
+
+        return np.array(new_peaks, dtype=np.int64)
+
+    def heart_rate(self, default=None):
+        """Current heart rate (BPM) from peaks inside the averaging window"""
+        oldest = self.samples_seen - self.window_samples
+        while self.recent_peaks and self.recent_peaks[0] < oldest:
+            self.recent_peaks.popleft()
+
+        if len(self.recent_peaks) < 2:
+            return default
+
+        # Mean of consecutive intervals == span / number of intervals
+        span = self.recent_peaks[-1] - self.recent_peaks[0]
+        avg_interval = span / (len(self.recent_peaks) - 1) / self.sample_rate
+        if avg_interval <= 0:
+            return default
+        return int(np.clip(60.0 / avg_interval, 30, 200))
+
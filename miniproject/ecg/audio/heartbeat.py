@@ -2,6 +2,7 @@ import pygame
 import numpy as np
 import threading
 import time
+from analysis.alarms import LOW, MEDIUM, HIGH
 
 
 class HeartbeatAudio:
@@ -18,11 +19,19 @@ class HeartbeatAudio:
 
             # Generate heartbeat sound
             self.heartbeat_sound = self.generate_heartbeat_sound()
+
+            # Alarm tones: more, faster and higher pulses for higher priorities
+            self.alarm_sounds = {
+                HIGH: self.generate_alarm_sound(pulses=5, frequency=880, spacing=0.1),
+                MEDIUM: self.generate_alarm_sound(pulses=3, frequency=660, spacing=0.2),
+                LOW: self.generate_alarm_sound(pulses=2, frequency=440, spacing=0.3),
+            }
             print("Audio system initialized successfully")
 
         except Exception as e:
             print(f"Audio initialization failed: {e}")
             self.heartbeat_sound = None
+            self.alarm_sounds = {}
 
     def generate_heartbeat_sound(self):
         """Generate synthetic heartbeat sound"""
@@ -60,6 +69,33 @@ class HeartbeatAudio:
             print(f"Sound generation failed: {e}")
             return None
 
+    def generate_alarm_sound(self, pulses, frequency, spacing, pulse_duration=0.15):
+        """Generate a burst of tone pulses for one alarm priority"""
+        try:
+            pulse_samples = int(pulse_duration * self.sample_rate)
+            step = int((pulse_duration + spacing) * self.sample_rate)
+            sound_data = np.zeros(step * pulses)
+
+            # Short fade in/out so pulses do not click
+            t = np.arange(pulse_samples) / self.sample_rate
+            fade = np.minimum(1.0, np.minimum(t, pulse_duration - t) / 0.01)
+            pulse = fade * np.sin(2 * np.pi * frequency * t) * 0.25
+            for i in range(pulses):
+                sound_data[i * step:i * step + pulse_samples] = pulse
+
+            sound_data = (sound_data * 32767).astype(np.int16)
+            return pygame.sndarray.make_sound(sound_data)
+
+        except Exception as e:
+            print(f"Alarm sound generation failed: {e}")
+            return None
+
+    def play_alarm(self, priority):
+        """Play the alarm tone for a priority (no-op without audio)"""
+        sound = self.alarm_sounds.get(priority)
+        if sound:
+            sound.play()
+
     def play_heartbeat_loop(self):
         """Play heartbeat sounds in a loop"""
         while self.is_playing and self.heartbeat_sound:
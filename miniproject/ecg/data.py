@@ -1,114 +1,442 @@
 import numpy as np
 import time
-from collections import deque
 import math
+from utils.ring_buffer import create_buffer
+from analysis.peak_detector import StreamingPeakDetector
+from analysis.pan_tompkins import PanTompkinsDetector
+from analysis.beat_features import BeatAnalyzer
+from analysis.hrv import HRVTracker
+from noise import NoiseGenerator, WhiteNoise
+from utils.history_pyramid import HistoryPyramid
+
+# R-peak detectors selectable by name
+DETECTORS = {
+    "threshold": StreamingPeakDetector,
+    "pan_tompkins": PanTompkinsDetector,
+}
+
+# Beat waves as (name, start, end, center, width, amplitude) in beat phase.
+# Windows are checked in order; a sample belongs to the first that covers it.
+BEAT_WAVES = (
+    ("P", 0.08, 0.18, 0.13, 0.04, 0.2),
+    ("Q", 0.35, 0.38, 0.365, 0.015, -0.15),
+    ("R", 0.38, 0.42, 0.4, 0.02, 1.2),
+    ("S", 0.42, 0.45, 0.43, 0.015, -0.3),
+    ("T", 0.65, 0.85, 0.75, 0.08, 0.25),
+)
+
+
+def beat_waveform(beat_phase, waves=BEAT_WAVES):
+    """Noise-free ECG value for an array of beat phases in [0, 1)"""
+    beat_phase = np.asarray(beat_phase, dtype=np.float64)
+    ecg_values = np.zeros(beat_phase.shape)
+    covered = np.zeros(beat_phase.shape, dtype=bool)
+
+    for _, start, end, center, width, amplitude in waves:
+        mask = (beat_phase >= start) & (beat_phase <= end) & ~covered
+        covered |= mask
+        pos = (beat_phase[mask] - center) / width
+        ecg_values[mask] = amplitude * np.exp(-0.5 * pos**2)
+
+    return ecg_values
+
+
+def build_beat_template(waves, size):
+    """Beat template over phase as per-cell (start values, deltas)
+
+    Each cell is evaluated just inside its own edges, so the steps at wave
+    window boundaries stay sharp as long as the boundaries fall on cell
+    edges (size is a multiple of 100 and all windows are on a 0.01 phase
+    grid).
+    """
+    edges = np.arange(size + 1) / size
+    inset = 1e-9
+    start = beat_waveform(edges[:-1] + inset, waves)
+    end = beat_waveform(edges[1:] - inset, waves)
+    return start, end - start
+
+
+def sample_template(template, phase):
+    """Linearly interpolate a beat template at phases in [0, 1)"""
+    template_start, template_delta = template
+    size = len(template_start)
+    position = phase * size
+    index = np.minimum(position.astype(np.intp), size - 1)
+    fraction = position - index
+    return template_start[index] + fraction * template_delta[index]
 
 
 class ECGDataGenerator:
-    def __init__(self, sample_rate=250, heart_rate=72):
-        """Initialize ECG data generator"""
+    def __init__(self, sample_rate=250, heart_rate=72, detector="pan_tompkins",
+                 noise=None, seed=None, history_seconds=None, recorder=None,
+                 storage="float32", filter_chain=None):
+        """Initialize ECG data generator
+
+        noise is a NoiseGenerator; by default white noise seeded with seed.
+        history_seconds enables a min/max HistoryPyramid for long-term review.
+        recorder (an ECGRecorder) receives every generated block, unfiltered.
+        storage="int16" keeps the display buffer as ADC counts.
+        filter_chain (a StreamingSOS) filters samples before display and
+        detection.
+        """
         self.sample_rate = sample_rate
         self.heart_rate = heart_rate
-        self.beat_duration = 60.0 / heart_rate
         self.current_time = 0.0
         self.time_step = 1.0 / sample_rate
+        self.beat_phase = 0.0
+
+        # Beat template lookup table, rebuilt when wave parameters change
+        self.waves = list(BEAT_WAVES)
+        self.template_size = 4000
+        self.template = None
+        self.template_key = None
+
+        # Noise is drawn in bulk from a seeded stream
+        self.noise = noise if noise is not None else NoiseGenerator(sample_rate, seed=seed)
 
         # Buffer for display data (10 seconds)
         self.buffer_size = sample_rate * 10
-        self.ecg_buffer = deque(maxlen=self.buffer_size)
-
-        # Initialize with baseline
-        for _ in range(self.buffer_size):
-            self.ecg_buffer.append(0.0)
-
-    def generate_ecg_sample(self, t):
-        """Generate realistic ECG waveform"""
-        # Calculate position within heartbeat cycle
-        beat_time = t % self.beat_duration
-        beat_phase = beat_time / self.beat_duration
-
-        ecg_value = 0.0
-
-        # P wave (8-18% of cycle)
-        if 0.08 <= beat_phase <= 0.18:
-            p_center = 0.13
-            p_width = 0.04
-            p_amplitude = 0.2
-            p_pos = (beat_phase - p_center) / p_width
-            ecg_value += p_amplitude * math.exp(-0.5 * p_pos**2)
-
-        # QRS complex (35-45% of cycle)
-        elif 0.35 <= beat_phase <= 0.45:
-            qrs_center = 0.4
-
-            # Q wave (negative deflection)
-            if 0.35 <= beat_phase <= 0.38:
-                q_amplitude = -0.15
-                q_width = 0.015
-                q_pos = (beat_phase - 0.365) / q_width
-                ecg_value += q_amplitude * math.exp(-0.5 * q_pos**2)
-
-            # R wave (large positive spike)
-            elif 0.38 <= beat_phase <= 0.42:
-                r_amplitude = 1.2
-                r_width = 0.02
-                r_pos = (beat_phase - qrs_center) / r_width
-                ecg_value += r_amplitude * math.exp(-0.5 * r_pos**2)
-
-            # S wave (negative after R)
-            else:
-                s_amplitude = -0.3
-                s_width = 0.015
-                s_pos = (beat_phase - 0.43) / s_width
-                ecg_value += s_amplitude * math.exp(-0.5 * s_pos**2)
-
-        # T wave (65-85% of cycle)
-        elif 0.65 <= beat_phase <= 0.85:
-            t_center = 0.75
-            t_width = 0.08
-            t_amplitude = 0.25
-            t_pos = (beat_phase - t_center) / t_width
-            ecg_value += t_amplitude * math.exp(-0.5 * t_pos**2)
+        self.ecg_buffer = create_buffer(self.buffer_size, storage)
+
+        # Optional long-term history for zoomable review
+        self.history = None
+        if history_seconds:
+            self.history = HistoryPyramid(sample_rate, history_seconds=history_seconds)
+        self.recorder = recorder
+        self.filter_chain = filter_chain
+
+        # Incremental R-peak detection over newly generated samples
+        self.peak_detector = DETECTORS[detector](sample_rate)
+        # Intervals and ST level of each detected beat, and rolling HRV
+        self.beat_analyzer = BeatAnalyzer(sample_rate)
+        self.hrv = HRVTracker()
+
+    @property
+    def heart_rate(self):
+        return self._heart_rate
+
+    @heart_rate.setter
+    def heart_rate(self, value):
+        self._heart_rate = value
+        self.beat_duration = 60.0 / value
+
+    def set_wave(self, name, amplitude=None, width=None):
+        """Change the amplitude and/or width of one beat wave (P, Q, R, S, T)"""
+        for i, (wave_name, start, end, center, old_width, old_amplitude) in enumerate(self.waves):
+            if wave_name == name:
+                self.waves[i] = (
+                    wave_name, start, end, center,
+                    old_width if width is None else width,
+                    old_amplitude if amplitude is None else amplitude,
+                )
+                return
+        raise ValueError(f"Unknown wave: {name}")
+
+    def get_template(self):
+        """Beat template over phase, rebuilt only when the waves change
+
+        Heart rate only sets how fast the phase advances, so it never
+        forces a rebuild.
+        """
+        key = tuple(self.waves)
+        if key != self.template_key:
+            self.template = build_beat_template(self.waves, self.template_size)
+            self.template_key = key
+        return self.template
+
+    def generate_block(self, n):
+        """Generate next n ECG samples in one vectorized step
+
+        Samples are interpolated from the beat template at the running beat
+        phase, so heart rate changes take effect without a phase jump.
+        """
+        phase_step = self.time_step / self.beat_duration
+        phase = np.mod(self.beat_phase + np.arange(n) * phase_step, 1.0)
+        self.beat_phase = (self.beat_phase + n * phase_step) % 1.0
+
+        # Gather + lerp into the template
+        new_samples = sample_template(self.get_template(), phase)
 
         # Add realistic noise
-        noise = np.random.normal(0, 0.015)
-        return ecg_value + noise
+        new_samples += self.noise.block(n)
+
+        if self.recorder is not None:
+            self.recorder.append(new_samples)
+        if self.filter_chain is not None:
+            new_samples = self.filter_chain.process(new_samples)[0]
+
+        self.ecg_buffer.extend(new_samples)
+        if self.history is not None:
+            self.history.push(new_samples)
+        peaks = self.peak_detector.process(new_samples)
+        new_beats = self.beat_analyzer.process(new_samples, peaks)
+        self.hrv.extend(new_beats["time"], new_beats["rr"])
+        self.current_time += n * self.time_step
+        self.hrv.update(self.current_time)
+        return new_samples
 
     def update(self):
         """Generate next ECG sample"""
-        new_sample = self.generate_ecg_sample(self.current_time)
-        self.ecg_buffer.append(new_sample)
-        self.current_time += self.time_step
-        return new_sample
+        return float(self.generate_block(1)[0])
 
     def get_display_data(self):
-        """Get ECG data for display"""
-        return list(self.ecg_buffer)
+        """Get ECG data for display (read-only view, valid until next update)"""
+        return self.ecg_buffer.view()
 
     def calculate_heart_rate(self):
         """Calculate heart rate from R-wave detection"""
-        data = list(self.ecg_buffer)[-self.sample_rate * 3:]  # Last 3 seconds
+        return self.peak_detector.heart_rate(default=self.heart_rate)
+
+
+class MultiPatientGenerator:
+    def __init__(self, num_patients, sample_rate=250, heart_rates=72,
+                 noise_levels=0.015, detector="pan_tompkins", seed=None,
+                 storage="float32", filter_chain=None):
+        """Advance many synthetic patients in one vectorized step
+
+        Heart rate, beat phase and noise level are per-patient arrays; the
+        beat template is shared. Display history is one (patients, samples)
+        ring buffer and R-peak detection runs over all patients at once.
+        filter_chain is a StreamingSOS with one channel per patient.
+        """
+        self.num_patients = num_patients
+        self.sample_rate = sample_rate
+        self.time_step = 1.0 / sample_rate
+        self.current_time = 0.0
+
+        self.heart_rates = np.broadcast_to(
+            np.asarray(heart_rates, dtype=np.float64), (num_patients,)).copy()
+        self.noise_levels = np.broadcast_to(
+            np.asarray(noise_levels, dtype=np.float64), (num_patients,)).copy()
+        self.noise = NoiseGenerator(sample_rate, [WhiteNoise(std=self.noise_levels)],
+                                    seed=seed, channels=num_patients)
+        self.beat_phase = np.zeros(num_patients)
+
+        self.waves = list(BEAT_WAVES)
+        self.template_size = 4000
+        self.template = build_beat_template(self.waves, self.template_size)
+
+        # Buffer for display data (10 seconds per patient)
+        self.buffer_size = sample_rate * 10
+        self.ecg_buffer = create_buffer(self.buffer_size, storage, channels=num_patients)
+        self.filter_chain = filter_chain
+
+        # Only Pan-Tompkins is multi-channel; None disables detection
+        self.new_peaks = [np.empty(0, dtype=np.int64)] * num_patients
+        if detector == "pan_tompkins":
+            self.peak_detector = PanTompkinsDetector(sample_rate, channels=num_patients)
+        elif detector is None:
+            self.peak_detector = None
+        else:
+            raise ValueError(f"Detector not available for multiple patients: {detector}")
+
+    def generate_block(self, n):
+        """Generate next n samples for every patient, returns (patients, n)"""
+        phase_step = self.time_step * self.heart_rates / 60.0
+        steps = np.arange(n)
+        phase = np.mod(self.beat_phase[:, None] + steps[None, :] * phase_step[:, None], 1.0)
+        self.beat_phase = np.mod(self.beat_phase + n * phase_step, 1.0)
+
+        new_samples = sample_template(self.template, phase)
+        new_samples += self.noise.block(n)
+        if self.filter_chain is not None:
+            new_samples = self.filter_chain.process(new_samples)
+
+        self.ecg_buffer.extend(new_samples)
+        if self.peak_detector is not None:
+            # Kept for consumers such as AlarmEngine.peaks()
+            self.new_peaks = self.peak_detector.process(new_samples)
+        self.current_time += n * self.time_step
+        return new_samples
+
+    def heart_rates_detected(self):
+        """Detected heart rate per patient (falls back to the set rate)"""
+        if self.peak_detector is None:
+            return self.heart_rates.astype(int)
+        rates = self.peak_detector.heart_rates()
+        rates = np.where(np.isnan(rates), self.heart_rates, rates)
+        return np.clip(rates, 30, 200).astype(int)
 
-        if len(data) < self.sample_rate:
+    def patient(self, index):
+        """Single-patient view with the ECGDataGenerator interface"""
+        return PatientView(self, index)
+
+
+class PatientView:
+    def __init__(self, bank, index):
+        """One patient of a MultiPatientGenerator, usable where an
+        ECGDataGenerator is expected
+
+        Generating through a view advances the whole bank, since all
+        patients share one clock.
+        """
+        self.bank = bank
+        self.index = index
+        self.sample_rate = bank.sample_rate
+
+    @property
+    def heart_rate(self):
+        return int(self.bank.heart_rates[self.index])
+
+    @heart_rate.setter
+    def heart_rate(self, value):
+        self.bank.heart_rates[self.index] = value
+
+    def generate_block(self, n):
+        """Advance the bank by n samples, return this patient's samples"""
+        return self.bank.generate_block(n)[self.index]
+
+    def update(self):
+        """Advance the bank by one sample"""
+        return float(self.generate_block(1)[0])
+
+    def get_display_data(self):
+        """Read-only view of this patient's display buffer"""
+        return self.bank.ecg_buffer.channel_view(self.index)
+
+    def calculate_heart_rate(self):
+        """Detected heart rate for this patient"""
+        if self.bank.peak_detector is None:
+            return self.heart_rate
+        rate = self.bank.peak_detector.heart_rates()[self.index]
+        if np.isnan(rate):
             return self.heart_rate
+        return int(np.clip(rate, 30, 200))
+
+
+# Standard 12-lead order
+LEAD_NAMES = ("I", "II", "III", "aVR", "aVL", "aVF",
+              "V1", "V2", "V3", "V4", "V5", "V6")
+
+
+def lead_matrix():
+    """(12, 3) projection of the cardiac vector onto each lead
+
+    Axes are x = patient's left, y = inferior, z = anterior. Limb leads
+    are built from I and II so Einthoven/Goldberger relations hold
+    exactly; precordial leads lie in the horizontal plane.
+    """
+    lead_i = np.array([1.0, 0.0, 0.0])
+    lead_ii = np.array([math.cos(math.radians(60)), math.sin(math.radians(60)), 0.0])
+    limb = [
+        lead_i,
+        lead_ii,
+        lead_ii - lead_i,            # III
+        -(lead_i + lead_ii) / 2.0,   # aVR
+        lead_i - lead_ii / 2.0,      # aVL
+        lead_ii - lead_i / 2.0,      # aVF
+    ]
+    # V1..V6 azimuths in the horizontal plane (0 deg = left, 90 deg = anterior)
+    precordial = [
+        np.array([math.cos(math.radians(a)), 0.0, math.sin(math.radians(a))])
+        for a in (120, 90, 75, 60, 30, 0)
+    ]
+    return np.array(limb + precordial)
+
+
+# Dipole direction of each beat wave as (frontal angle in degrees, anterior z).
+# Directions are scaled so lead II reproduces the single-lead waveform.
+WAVE_DIRECTIONS = {
+    "P": (55.0, 0.3),
+    "Q": (30.0, -0.6),
+    "R": (60.0, -0.3),
+    "S": (80.0, 0.5),
+    "T": (45.0, 0.4),
+}
 
-        # Simple R-wave detection
-        peaks = []
-        threshold = 0.6
-        min_distance = int(0.4 * self.sample_rate)  # Min 0.4s between beats
 
-        for i in range(2, len(data) - 2):
-            if (data[i] > threshold and
-                data[i] > data[i - 1] and data[i] > data[i + 1] and
-                    data[i] > data[i - 2] and data[i] > data[i + 2]):
+class MultiLeadGenerator:
+    def __init__(self, sample_rate=250, heart_rate=72, detector="pan_tompkins",
+                 noise=None, seed=None, storage="float32", filter_chain=None):
+        """Synthesize the standard 12 leads from one cardiac-vector model
 
-                if not peaks or i - peaks[-1] >= min_distance:
-                    peaks.append(i)
+        Each wave is a scalar template times a fixed dipole direction, so a
+        block of all leads is one (12, waves) @ (waves, n) matrix product.
+        Blocks are (12, n) float32 and history is a channel-major ring buffer.
+        filter_chain is a StreamingSOS with one channel per lead.
+        """
+        self.sample_rate = sample_rate
+        self.heart_rate = heart_rate
+        self.time_step = 1.0 / sample_rate
+        self.current_time = 0.0
+        self.beat_phase = 0.0
+        self.lead_names = LEAD_NAMES
+        if noise is None:
+            noise = NoiseGenerator(sample_rate, seed=seed, channels=len(LEAD_NAMES))
+        self.noise = noise
+
+        # Per-wave templates stacked as (waves, cells)
+        self.waves = list(BEAT_WAVES)
+        self.template_size = 4000
+        templates = [build_beat_template((wave,), self.template_size) for wave in self.waves]
+        self.template_start = np.stack([start for start, _ in templates])
+        self.template_delta = np.stack([delta for _, delta in templates])
+
+        # Lead mixing matrix: leads x waves
+        leads = lead_matrix()
+        directions = []
+        for wave in self.waves:
+            angle, anterior = WAVE_DIRECTIONS[wave[0]]
+            direction = np.array([math.cos(math.radians(angle)),
+                                  math.sin(math.radians(angle)), anterior])
+            directions.append(direction / np.dot(leads[1], direction))
+        self.mixing = leads @ np.array(directions).T
+
+        # Buffer for display data (10 seconds, all leads)
+        self.buffer_size = sample_rate * 10
+        self.ecg_buffer = create_buffer(self.buffer_size, storage, channels=len(LEAD_NAMES))
+        self.filter_chain = filter_chain
+
+        # Heart rate is detected on lead II
+        self.peak_detector = DETECTORS[detector](sample_rate)
+
+    @property
+    def heart_rate(self):
+        return self._heart_rate
 
-        if len(peaks) >= 2:
-            intervals = [peaks[i + 1] - peaks[i] for i in range(len(peaks) - 1)]
-            avg_interval = np.mean(intervals) / self.sample_rate
-            calculated_hr = 60.0 / avg_interval if avg_interval > 0 else self.heart_rate
-            return int(np.clip(calculated_hr, 30, 200))
+    @heart_rate.setter
+    def heart_rate(self, value):
+        self._heart_rate = value
+        self.beat_duration = 60.0 / value
 
-        return self.heart_rate
+    def generate_block(self, n):
+        """Generate next n samples of all leads, returns (12, n) float32"""
+        phase_step = self.time_step / self.beat_duration
+        phase = np.mod(self.beat_phase + np.arange(n) * phase_step, 1.0)
+        self.beat_phase = (self.beat_phase + n * phase_step) % 1.0
+
+        # Per-wave scalar waveforms (waves, n), shared gather for all waves
+        position = phase * self.template_size
+        index = np.minimum(position.astype(np.intp), self.template_size - 1)
+        fraction = position - index
+        waves = self.template_start[:, index] + fraction * self.template_delta[:, index]
+
+        new_samples = (self.mixing @ waves).astype(np.float32)
+        new_samples += self.noise.block(n).astype(np.float32)
+        if self.filter_chain is not None:
+            new_samples = self.filter_chain.process(new_samples).astype(np.float32)
+
+        self.ecg_buffer.extend(new_samples)
+        self.peak_detector.process(new_samples[1])
+        self.current_time += n * self.time_step
+        return new_samples
+
+    def update(self):
+        """Generate next sample of all leads, returns (12,)"""
+        return self.generate_block(1)[:, 0]
+
+    def lead_index(self, lead):
+        """Row of a lead given its name or index"""
+        return self.lead_names.index(lead) if isinstance(lead, str) else lead
+
+    def get_display_data(self, lead="II"):
+        """Read-only view of one lead's display buffer"""
+        return self.ecg_buffer.channel_view(self.lead_index(lead))
+
+    def get_all_leads(self):
+        """Read-only (12, samples) view of the display buffer"""
+        return self.ecg_buffer.view()
+
+    def calculate_heart_rate(self):
+        """Calculate heart rate from R-wave detection on lead II"""
+        return self.peak_detector.heart_rate(default=self.heart_rate)
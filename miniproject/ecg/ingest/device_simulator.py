@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import socket
+import numpy as np
+from data import MultiPatientGenerator
+from ingest.protocol import encode_packet
+from utils.sim_clock import SimulationClock
+
+
+class DeviceSimulator:
+    def __init__(self, num_devices, sample_rate=250, packet_interval=0.04,
+                 gain=1000.0, first_device_id=1, seed=None):
+        """Stand-in bedside monitors streaming synthetic ECG packets
+
+        All devices are generated together by one MultiPatientGenerator;
+        every packet_interval each device sends the samples due since the
+        last packet.
+        """
+        rng = np.random.default_rng(seed)
+        self.bank = MultiPatientGenerator(
+            num_devices, sample_rate, heart_rates=rng.uniform(55, 110, num_devices),
+            detector=None, seed=seed)
+        self.device_ids = list(range(first_device_id, first_device_id + num_devices))
+        self.sample_rate = sample_rate
+        self.packet_interval = packet_interval
+        self.gain = gain
+        self.sequence = 0
+        self.clock = SimulationClock(sample_rate)
+
+    def next_packets(self):
+        """One packet per device with the samples due now"""
+        samples_due = self.clock.tick()
+        if not samples_due:
+            return []
+        block = self.bank.generate_block(samples_due)
+        counts = np.clip(np.rint(block * self.gain), -32768, 32767).astype(np.int16)
+        packets = [encode_packet(device_id, self.sequence, counts[i], self.sample_rate, self.gain)
+                   for i, device_id in enumerate(self.device_ids)]
+        self.sequence += 1
+        return packets
+
+    async def run_tcp(self, host, port, duration=None):
+        """Stream over one TCP connection per device"""
+        connections = [await asyncio.open_connection(host, port) for _ in self.device_ids]
+        writers = [writer for _, writer in connections]
+        try:
+            await self._run(duration, lambda packets: self._send_tcp(writers, packets))
+        finally:
+            for writer in writers:
+                writer.close()
+
+    async def _send_tcp(self, writers, packets):
+        for writer, packet in zip(writers, packets):
+            writer.write(packet)
+        # Honour backpressure from the server
+        await asyncio.gather(*(writer.drain() for writer in writers))
+
+    async def run_udp(self, host, port, duration=None):
+        """Stream over a single UDP socket (no backpressure)"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        async def send(packets):
+            for i, packet in enumerate(packets):
+                sock.sendto(packet, (host, port))
+                # Yield between bursts so a receiver on this loop keeps up
+                if i % 64 == 63:
+                    await asyncio.sleep(0)
+
+        try:
+            await self._run(duration, send)
+        finally:
+            sock.close()
+
+    async def _run(self, duration, send):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        self.clock.start()
+        while duration is None or loop.time() - start < duration:
+            await send(self.next_packets())
+            await asyncio.sleep(self.packet_interval)
+
+
+def main():
+    """Entry point (run from the ecg directory: python -m ingest.device_simulator)"""
+    parser = argparse.ArgumentParser(description="Simulated ECG bedside devices")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9750)
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--rate", type=int, default=250)
+    parser.add_argument("--udp", action="store_true")
+    parser.add_argument("--duration", type=float, default=None)
+    args = parser.parse_args()
+
+    simulator = DeviceSimulator(args.devices, args.rate)
+    run = simulator.run_udp if args.udp else simulator.run_tcp
+    try:
+        asyncio.run(run(args.host, args.port, args.duration))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
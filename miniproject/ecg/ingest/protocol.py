@@ -0,0 +1,46 @@
+import struct
+from collections import namedtuple
+import numpy as np
+
+MAGIC = b"ECGP"
+VERSION = 1
+
+# magic, version, channels, sample_rate, device_id, sequence, count, reserved, gain
+HEADER = struct.Struct("<4sBBHIIHHf")
+
+PacketHeader = namedtuple(
+    "PacketHeader", "device_id sequence sample_rate channels count gain payload_size")
+
+
+def encode_packet(device_id, sequence, counts, sample_rate, gain):
+    """Frame a (channels, n) block of int16 ADC counts as one packet
+
+    The payload is frame-major little-endian int16; gain is ADC counts
+    per mV.
+    """
+    counts = np.asarray(counts, dtype="<i2")
+    if counts.ndim == 1:
+        counts = counts[None, :]
+    channels, count = counts.shape
+    header = HEADER.pack(MAGIC, VERSION, channels, int(sample_rate), device_id,
+                         sequence & 0xFFFFFFFF, count, 0, gain)
+    return header + counts.T.tobytes()
+
+
+def decode_header(data):
+    """Parse a packet header, raises ValueError on a bad magic/version or
+    an empty layout"""
+    magic, version, channels, sample_rate, device_id, sequence, count, _, gain = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not an ECG sample packet")
+    if channels == 0 or sample_rate == 0:
+        raise ValueError("Packet has no channels or no sample rate")
+    return PacketHeader(device_id, sequence, sample_rate, channels, count, gain,
+                        channels * count * 2)
+
+
+def decode_payload(header, payload):
+    """(channels, count) int16 counts from a packet payload"""
+    frames = np.frombuffer(payload, dtype="<i2", count=header.channels * header.count)
+    return frames.reshape(header.count, header.channels).T
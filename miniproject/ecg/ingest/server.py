@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import socket
+import struct
+from ingest.protocol import HEADER, decode_header, decode_payload
+from utils.ring_buffer import ADCRingBuffer
+
+
+class DeviceStream:
+    def __init__(self, device_id, channels, sample_rate, gain,
+                 buffer_seconds=10, queue_size=32):
+        """Per-device ring buffer fed through a bounded queue
+
+        Packets are queued as decoded int16 blocks and a single drain task
+        writes them into the device's ADCRingBuffer. A full queue makes TCP
+        readers wait (backpressure); UDP packets are dropped instead.
+        """
+        self.device_id = device_id
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.gain = gain
+        self.ecg_buffer = ADCRingBuffer(int(sample_rate * buffer_seconds),
+                                        gain=gain, channels=channels)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+        self.next_sequence = None
+        self.packets = 0
+        self.samples = 0
+        self.lost_packets = 0        # Sequence gaps seen on arrival
+        self.reordered_packets = 0   # Late or duplicate, discarded
+        self.restarts = 0            # Sequence jumped back, e.g. a device reboot
+        self.dropped_packets = 0     # Discarded because the queue was full
+
+        self.task = asyncio.get_running_loop().create_task(self.drain())
+        self.task.add_done_callback(self._drain_done)
+
+    def matches(self, header):
+        """True if a packet has the layout this stream was created with"""
+        return (header.channels == self.channels and header.sample_rate == self.sample_rate
+                and header.gain == self.gain)
+
+    def check_sequence(self, sequence, reorder_window=64):
+        """Count packets missing from the sequence, return False to discard
+
+        The step from the expected sequence number is read as a signed
+        32-bit value. Forward gaps count as lost; a step back within
+        reorder_window is a late or duplicate packet, whose samples would
+        land after newer ones, so it is discarded. A larger step back is
+        taken as the device restarting its sequence.
+        """
+        if self.next_sequence is not None:
+            step = ((sequence - self.next_sequence + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+            if step > 0:
+                self.lost_packets += step
+            elif step < 0:
+                if step >= -reorder_window:
+                    self.reordered_packets += 1
+                    return False
+                self.restarts += 1
+        self.next_sequence = (sequence + 1) & 0xFFFFFFFF
+        return True
+
+    async def drain(self):
+        """Move queued blocks into the ring buffer"""
+        while True:
+            block = await self.queue.get()
+            self.ecg_buffer.extend_counts(block)
+            self.samples += block.shape[1]
+            self.packets += 1
+
+    def _drain_done(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Device {self.device_id}: drain task failed: {task.exception()!r}")
+
+    def get_display_data(self, channel=0):
+        """Newest samples of one channel in mV"""
+        return self.ecg_buffer.channel_view(channel)
+
+
+class UDPIngestProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        try:
+            header = decode_header(data)
+        except (ValueError, struct.error):
+            self.server.bad_packets += 1
+            return
+        payload = data[HEADER.size:HEADER.size + header.payload_size]
+        if len(payload) != header.payload_size:
+            self.server.bad_packets += 1
+            return
+
+        stream = self.server.device(header)
+        if stream is None or not stream.check_sequence(header.sequence):
+            return
+        try:
+            stream.queue.put_nowait(decode_payload(header, payload))
+        except asyncio.QueueFull:
+            stream.dropped_packets += 1
+
+
+class IngestServer:
+    def __init__(self, host="127.0.0.1", port=9750, buffer_seconds=10, queue_size=32,
+                 udp_receive_buffer=4 << 20):
+        """Accept framed sample packets from many devices on one event loop
+
+        Devices are identified by the id in each packet, not by connection,
+        so TCP and UDP senders land in the same per-device streams.
+        """
+        self.host = host
+        self.port = port
+        self.buffer_seconds = buffer_seconds
+        self.queue_size = queue_size
+        self.udp_receive_buffer = udp_receive_buffer
+        self.devices = {}
+        self.bad_packets = 0
+        self.tcp_server = None
+        self.udp_transport = None
+
+    def device(self, header):
+        """Stream for a packet's device, created on first contact
+
+        Returns None (and counts a bad packet) if the packet's layout
+        differs from the one the device first reported.
+        """
+        stream = self.devices.get(header.device_id)
+        if stream is None:
+            stream = DeviceStream(header.device_id, header.channels, header.sample_rate,
+                                  header.gain, self.buffer_seconds, self.queue_size)
+            self.devices[header.device_id] = stream
+        elif not stream.matches(header):
+            self.bad_packets += 1
+            return None
+        return stream
+
+    async def handle_tcp(self, reader, writer):
+        """Read packets from one TCP connection until it closes"""
+        try:
+            while True:
+                header = decode_header(await reader.readexactly(HEADER.size))
+                payload = await reader.readexactly(header.payload_size)
+                stream = self.device(header)
+                if stream is None or not stream.check_sequence(header.sequence):
+                    continue
+                # Waits while the queue is full, which stops reading the
+                # socket and lets TCP flow control slow the sender
+                await stream.queue.put(decode_payload(header, payload))
+        except asyncio.IncompleteReadError:
+            pass
+        except ValueError:
+            self.bad_packets += 1
+        finally:
+            writer.close()
+
+    async def start(self, tcp=True, udp=True):
+        """Start listening on the configured port"""
+        if tcp:
+            self.tcp_server = await asyncio.start_server(self.handle_tcp, self.host, self.port)
+        if udp:
+            loop = asyncio.get_running_loop()
+            self.udp_transport, _ = await loop.create_datagram_endpoint(
+                lambda: UDPIngestProtocol(self), local_addr=(self.host, self.port))
+            # Bursts from hundreds of devices overflow the default receive buffer
+            sock = self.udp_transport.get_extra_info("socket")
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.udp_receive_buffer)
+
+    def close(self):
+        """Stop listening and cancel the drain tasks"""
+        if self.tcp_server:
+            self.tcp_server.close()
+        if self.udp_transport:
+            self.udp_transport.close()
+        for stream in self.devices.values():
+            stream.task.cancel()
+
+    def stats(self):
+        """Totals across all devices"""
+        streams = self.devices.values()
+        return {
+            "devices": len(self.devices),
+            "samples": sum(s.samples for s in streams),
+            "lost_packets": sum(s.lost_packets for s in streams),
+            "reordered_packets": sum(s.reordered_packets for s in streams),
+            "dropped_packets": sum(s.dropped_packets for s in streams),
+            "bad_packets": self.bad_packets,
+        }
+
+
+async def serve(host, port, tcp, udp):
+    """Run the ingest server and print throughput once a second"""
+    server = IngestServer(host, port)
+    await server.start(tcp=tcp, udp=udp)
+    print(f"Listening on {host}:{port} (TCP: {tcp}, UDP: {udp})")
+    last_samples = 0
+    try:
+        while True:
+            await asyncio.sleep(1.0)
+            stats = server.stats()
+            print(f"{stats['devices']} devices, {stats['samples'] - last_samples} samples/s, "
+                  f"lost {stats['lost_packets']}, dropped {stats['dropped_packets']}")
+            last_samples = stats["samples"]
+    finally:
+        server.close()
+
+
+def main():
+    """Entry point (run from the ecg directory: python -m ingest.server)"""
+    parser = argparse.ArgumentParser(description="ECG device stream ingest server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9750)
+    parser.add_argument("--no-tcp", action="store_true")
+    parser.add_argument("--no-udp", action="store_true")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, not args.no_tcp, not args.no_udp))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
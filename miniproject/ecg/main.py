@@ -2,38 +2,106 @@ import glfw
 import OpenGL.GL as gl
 import time
 import sys
+import argparse
 from data import ECGDataGenerator
-from render import ECGRenderer
+from render import RENDERERS
 from audio.heartbeat import HeartbeatAudio
+from utils.sim_clock import SimulationClock
+from recording.replay import RecordingSource
+from producer import SharedMemorySource
+from analysis.filters import StreamingSOS, ecg_filter_sections
+from analysis.alarms import AlarmEngine, HeartRateHigh, HeartRateLow, PRIORITY_NAMES
 
 
 class ECGVisualizerApp:
-    def __init__(self, width=1200, height=600):
-        """Initialize ECG visualizer application"""
+    def __init__(self, width=1200, height=600, recording=None, use_process=False,
+                 mains=None, renderer="immediate", display_mode="scroll",
+                 history_hours=None):
+        """Initialize ECG visualizer application
+
+        recording is an optional WFDB header (.hea) or CSV file to replay
+        instead of the synthetic generator. use_process moves generation
+        and analysis into a separate producer process. mains (50 or 60 Hz)
+        enables the baseline-wander/notch/low-pass filter chain. renderer
+        picks a backend from render.RENDERERS; display_mode "sweep" or
+        "ring" selects the shader backend's sweep (erase-bar) or GPU ring
+        display. history_hours keeps a min/max history of the generator
+        for the zoomable review view (H key).
+        """
         self.width = width
         self.height = height
         self.window = None
+        self.recording = recording
+        self.use_process = use_process
+        self.mains = mains
+        self.renderer_name = renderer
+        self.display_mode = display_mode
+        self.history_hours = history_hours
+
+        # Long-term review: None shows the live trace, otherwise an index
+        # into review_spans (seconds across the window)
+        self.review_spans = (60, 600, 3600, 6 * 3600, 24 * 3600)
+        self.review_index = None
 
         # Initialize components
-        self.ecg_generator = ECGDataGenerator(sample_rate=250, heart_rate=72)
+        self.ecg_generator = self.create_source(heart_rate=72)
+        self.sim_clock = SimulationClock(self.ecg_generator.sample_rate)
         self.heartbeat_audio = HeartbeatAudio()
+        self.alarm_engine = self.create_alarm_engine()
+        self.beats_reported = 0
+        self.alarm_repeat = 1.0          # Seconds between alarm sounds
+        self.alarm_sounded = None        # Simulated time of the last one
+        self.dropped_reported = 0        # Clock samples dropped at the last report
 
         # Timing
         self.last_time = time.time()
         self.frame_count = 0
         self.fps = 0
+        self.current_heart_rate = 72
 
         # State
         self.audio_enabled = True
 
+    def create_source(self, heart_rate):
+        """Create the sample source: a recording replay or the generator"""
+        if self.use_process:
+            return SharedMemorySource(heart_rate=heart_rate, recording=self.recording,
+                                      mains=self.mains)
+        if self.recording:
+            return RecordingSource(self.recording, mains=self.mains)
+        filter_chain = None
+        if self.mains:
+            filter_chain = StreamingSOS(ecg_filter_sections(250, mains=self.mains))
+        history_seconds = self.history_hours * 3600 if self.history_hours else None
+        return ECGDataGenerator(sample_rate=250, heart_rate=heart_rate,
+                                filter_chain=filter_chain, history_seconds=history_seconds)
+
+    def create_alarm_engine(self):
+        """Alarm rules for the current source
+
+        Beat-driven rules (asystole, tachy runs, ST shift) need the
+        source's beat analysis; sources without it get the HR limits only.
+        """
+        if hasattr(self.ecg_generator, "beat_analyzer"):
+            return AlarmEngine()
+        return AlarmEngine(rules=[HeartRateHigh(), HeartRateLow()])
+
     def init_glfw(self):
         """Initialize GLFW and create window"""
         if not glfw.init():
             raise RuntimeError("Failed to initialize GLFW")
 
-        # Use compatibility profile for better compatibility
-        glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 2)
-        glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 1)
+        if self.renderer_name == "immediate":
+            # Use compatibility profile for better compatibility
+            glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 2)
+            glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 1)
+        else:
+            # The shipped shaders are GLSL 330 core
+            glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
+            glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+            glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+            if sys.platform == "darwin":
+                glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, True)
         glfw.window_hint(glfw.SAMPLES, 4)
 
         # Create window
@@ -60,7 +128,10 @@ class ECGVisualizerApp:
         print(f"OpenGL Vendor: {gl.glGetString(gl.GL_VENDOR).decode()}")
 
         # Initialize renderer
-        self.renderer = ECGRenderer(self.width, self.height)
+        self.renderer = RENDERERS[self.renderer_name](self.width, self.height)
+        self.renderer.set_dpi_scale(glfw.get_window_content_scale(self.window)[0])
+        if self.display_mode != "scroll":
+            self.renderer.display_mode = self.display_mode
 
         # Start audio
         if self.audio_enabled:
@@ -73,6 +144,9 @@ class ECGVisualizerApp:
         print("  SPACE - Toggle audio")
         print("  UP    - Increase heart rate")
         print("  DOWN  - Decrease heart rate")
+        if self.history():
+            print("  H     - Toggle long-term review")
+            print("  LEFT/RIGHT - Zoom review out/in")
 
     def framebuffer_size_callback(self, window, width, height):
         """Handle window resize"""
@@ -87,7 +161,14 @@ class ECGVisualizerApp:
                 glfw.set_window_should_close(window, True)
             elif key == glfw.KEY_R:
                 current_hr = self.ecg_generator.heart_rate
-                self.ecg_generator = ECGDataGenerator(sample_rate=250, heart_rate=current_hr)
+                self.close_source()
+                self.ecg_generator = self.create_source(heart_rate=current_hr)
+                self.alarm_engine = self.create_alarm_engine()
+                self.beats_reported = 0
+                self.alarm_sounded = None
+                self.renderer.reset()
+                self.sim_clock.start()
+                self.dropped_reported = 0
                 print(f"ECG reset (HR: {current_hr} BPM)")
             elif key == glfw.KEY_SPACE:
                 if self.audio_enabled:
@@ -98,6 +179,12 @@ class ECGVisualizerApp:
                     self.heartbeat_audio.start_heartbeat(self.ecg_generator.heart_rate)
                     self.audio_enabled = True
                     print("Audio ON")
+            elif key == glfw.KEY_H and self.history():
+                self.review_index = None if self.review_index is not None else 0
+            elif key in (glfw.KEY_LEFT, glfw.KEY_RIGHT) and self.review_index is not None:
+                step = 1 if key == glfw.KEY_LEFT else -1
+                self.review_index = min(max(self.review_index + step, 0),
+                                        len(self.review_spans) - 1)
             elif key == glfw.KEY_UP:
                 new_hr = min(200, self.ecg_generator.heart_rate + 5)
                 self.ecg_generator.heart_rate = new_hr
@@ -111,6 +198,20 @@ class ECGVisualizerApp:
                     self.heartbeat_audio.update_bpm(new_hr)
                 print(f"Heart rate: {new_hr} BPM")
 
+    def history(self):
+        """The source's HistoryPyramid, if it keeps one"""
+        return getattr(self.ecg_generator, "history", None)
+
+    def review_envelope(self):
+        """draw_envelope arguments for the review span, None when live"""
+        history = self.history()
+        if self.review_index is None or history is None:
+            return None
+        end = history.samples_seen / history.sample_rate
+        start = end - self.review_spans[self.review_index]
+        times, mins, maxs = history.query(start, end, self.width)
+        return times, mins, maxs, start, end
+
     def update_fps(self):
         """Update FPS counter"""
         current_time = time.time()
@@ -121,28 +222,88 @@ class ECGVisualizerApp:
             self.frame_count = 0
             self.last_time = current_time
 
-            heart_rate = self.ecg_generator.calculate_heart_rate()
+            heart_rate = self.current_heart_rate
             audio_status = "ON" if self.audio_enabled else "OFF"
             title = f"ECG Visualizer - HR: {heart_rate} BPM - Audio: {audio_status} - FPS: {self.fps}"
+
+            if self.review_index is not None:
+                span = self.review_spans[self.review_index]
+                title += f" - Review: {span // 3600} h" if span >= 3600 else \
+                    f" - Review: {span // 60} min"
+
+            # Rolling 5-minute HRV from sources that track it
+            hrv = getattr(self.ecg_generator, "hrv", None)
+            if hrv is not None:
+                metrics = hrv.metrics(300)
+                if metrics["count"] > 1:
+                    title += f" - SDNN: {metrics['sdnn']:.0f} ms - RMSSD: {metrics['rmssd']:.0f} ms"
+
+            # Time the clock skipped after stalled frames, and the lag it left
+            clock = self.sim_clock
+            if clock.samples_dropped:
+                dropped = clock.samples_dropped / clock.sample_rate
+                title += f" - Dropped: {dropped:.1f} s - Drift: {clock.drift():.1f} s"
+                if clock.samples_dropped > self.dropped_reported:
+                    print(f"Frame stall: {dropped:.2f} s of signal dropped so far, "
+                          f"drift {clock.drift():.2f} s")
+                    self.dropped_reported = clock.samples_dropped
+
+            alarms = self.alarm_engine.active_alarms()
+            if alarms:
+                title += f" - ALARM: {alarms[0][0]}"
             glfw.set_window_title(self.window, title)
 
+    def update_alarms(self, heart_rate):
+        """Report new beats to the alarm engine and announce alarm changes"""
+        beat_analyzer = getattr(self.ecg_generator, "beat_analyzer", None)
+        if beat_analyzer is not None:
+            new_beats = beat_analyzer.beats.rows()[self.beats_reported:]
+            self.beats_reported += len(new_beats)
+            for beat in new_beats:
+                self.alarm_engine.beat(0, beat["time"], beat["st_level"])
+
+        now = self.sim_clock.simulated_time()
+        events = self.alarm_engine.update(now, heart_rate)
+        for event in events:
+            if event.raised:
+                print(f"ALARM ({PRIORITY_NAMES[event.priority]}): {event.message}")
+            else:
+                print(f"Alarm cleared: {event.rule}")
+
+        # Sound the most severe active alarm when one is raised, then once
+        # every alarm_repeat seconds while any stays active
+        alarms = self.alarm_engine.active_alarms()
+        if not alarms:
+            self.alarm_sounded = None
+        elif self.audio_enabled and (
+                any(event.raised for event in events) or self.alarm_sounded is None or
+                now - self.alarm_sounded >= self.alarm_repeat):
+            self.heartbeat_audio.play_alarm(alarms[0][1])
+            self.alarm_sounded = now
+
     def run(self):
         """Main application loop"""
         try:
             self.init_glfw()
+            self.sim_clock.start()
 
             while not glfw.window_should_close(self.window):
                 glfw.poll_events()
 
-                # Update ECG data
-                self.ecg_generator.update()
+                # Produce the samples due since the last frame in one batch
+                samples_due = self.sim_clock.tick()
+                new_samples = self.ecg_generator.generate_block(samples_due)
+                self.renderer.push_samples(new_samples)
 
                 # Get display data
                 ecg_data = self.ecg_generator.get_display_data()
                 heart_rate = self.ecg_generator.calculate_heart_rate()
+                self.current_heart_rate = heart_rate
+                self.update_alarms(heart_rate)
 
                 # Render frame
-                self.renderer.render(ecg_data, heart_rate, self.audio_enabled)
+                self.renderer.render(ecg_data, heart_rate, self.audio_enabled,
+                                     self.review_envelope())
 
                 # Swap buffers
                 glfw.swap_buffers(self.window)
@@ -163,8 +324,14 @@ class ECGVisualizerApp:
 
         return 0
 
+    def close_source(self):
+        """Stop the sample source if it owns a process"""
+        if hasattr(self.ecg_generator, 'close'):
+            self.ecg_generator.close()
+
     def cleanup(self):
         """Clean up resources"""
+        self.close_source()
         if hasattr(self, 'heartbeat_audio'):
             self.heartbeat_audio.stop_heartbeat()
         if self.window:
@@ -175,7 +342,28 @@ class ECGVisualizerApp:
 
 def main():
     """Entry point"""
-    app = ECGVisualizerApp(width=1200, height=600)
+    parser = argparse.ArgumentParser(description="Real-time ECG visualizer")
+    parser.add_argument("recording", nargs="?", help="WFDB header (.hea) or CSV file to replay")
+    parser.add_argument("--process", action="store_true",
+                        help="generate and analyse samples in a separate process")
+    parser.add_argument("--mains", type=float, choices=(50.0, 60.0),
+                        help="filter baseline wander and mains interference at this frequency")
+    parser.add_argument("--renderer", choices=sorted(RENDERERS), default="immediate",
+                        help="OpenGL backend (shader needs OpenGL 3.3)")
+    parser.add_argument("--history", type=float, metavar="HOURS",
+                        help="keep this much min/max history for review (H key)")
+    parser.add_argument("--display", choices=("scroll", "sweep", "ring"), default="scroll",
+                        help="sweep (erase-bar) or GPU ring scrolling (shader renderer)")
+    args = parser.parse_args()
+    if args.display != "scroll" and args.renderer != "shader":
+        parser.error(f"--display {args.display} needs --renderer shader")
+    if args.history and (args.recording or args.process):
+        parser.error("--history needs the built-in generator in this process")
+
+    app = ECGVisualizerApp(width=1200, height=600, recording=args.recording,
+                           use_process=args.process, mains=args.mains,
+                           renderer=args.renderer, display_mode=args.display,
+                           history_hours=args.history)
     return app.run()
 
 
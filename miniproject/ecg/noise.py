@@ -0,0 +1,171 @@
+import numpy as np
+
+
+class NoiseModel:
+    """Base class for block noise models
+
+    A model is bound to a sample rate, channel count and its own random
+    generator by NoiseGenerator, then asked for blocks in order. Models
+    draw random numbers in a way that does not depend on block sizes, so
+    a seeded run gives the same signal however it is chunked.
+    """
+
+    def bind(self, sample_rate, channels, rng):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.rng = rng
+
+    def block(self, n):
+        """Return a (channels, n) block of noise"""
+        raise NotImplementedError
+
+
+class NormalPool:
+    def __init__(self, rng, channels, pool_size):
+        """Standard normals generated in bulk and handed out in order"""
+        self.rng = rng
+        self.channels = channels
+        self.pool_size = pool_size
+        self.pool = np.empty((channels, 0))
+        self.position = 0
+
+    def take(self, n):
+        """Next n standard normals per channel, (channels, n)"""
+        available = self.pool.shape[1] - self.position
+        if n <= available:
+            out = self.pool[:, self.position:self.position + n]
+            self.position += n
+            return out
+
+        parts = [self.pool[:, self.position:]]
+        needed = n - available
+        # Refill in whole pools so the stream is independent of block sizes
+        refills = -(-needed // self.pool_size)
+        fresh = np.concatenate(
+            [self.rng.standard_normal((self.channels, self.pool_size)) for _ in range(refills)],
+            axis=1)
+        parts.append(fresh[:, :needed])
+        self.pool = fresh
+        self.position = needed
+        return np.concatenate(parts, axis=1)
+
+
+class WhiteNoise(NoiseModel):
+    def __init__(self, std=0.015, pool_seconds=1.0):
+        """Gaussian white noise; std is a scalar or one value per channel"""
+        self.std = std
+        self.pool_seconds = pool_seconds
+
+    def bind(self, sample_rate, channels, rng):
+        super().bind(sample_rate, channels, rng)
+        self.normals = NormalPool(rng, channels, max(1, int(self.pool_seconds * sample_rate)))
+
+    def block(self, n):
+        std = np.asarray(self.std, dtype=np.float64)
+        if std.ndim:
+            std = std[:, None]
+        return self.normals.take(n) * std
+
+
+class SinusoidNoise(NoiseModel):
+    def __init__(self, amplitude, frequency):
+        """Sinusoid with a random starting phase per channel"""
+        self.amplitude = amplitude
+        self.frequency = frequency
+
+    def bind(self, sample_rate, channels, rng):
+        super().bind(sample_rate, channels, rng)
+        self.phase = rng.uniform(0.0, 2.0 * np.pi, channels)
+
+    def block(self, n):
+        step = 2.0 * np.pi * self.frequency / self.sample_rate
+        phase = self.phase[:, None] + np.arange(n)[None, :] * step
+        self.phase = np.mod(self.phase + n * step, 2.0 * np.pi)
+        return self.amplitude * np.sin(phase)
+
+
+class BaselineWander(SinusoidNoise):
+    def __init__(self, amplitude=0.1, frequency=0.3):
+        """Slow respiratory baseline drift"""
+        super().__init__(amplitude, frequency)
+
+
+class MainsInterference(SinusoidNoise):
+    def __init__(self, amplitude=0.02, frequency=50.0):
+        """Powerline pickup at 50 or 60 Hz"""
+        super().__init__(amplitude, frequency)
+
+
+class EMGBursts(NoiseModel):
+    def __init__(self, std=0.06, rate=0.2, duration=0.5):
+        """Muscle artifact: bursts of broadband noise
+
+        Burst onsets are a Poisson process with `rate` bursts per second;
+        each burst lasts about `duration` seconds.
+        """
+        self.std = std
+        self.rate = rate
+        self.duration = duration
+
+    def bind(self, sample_rate, channels, rng):
+        super().bind(sample_rate, channels, rng)
+        # Separate streams for burst noise and each channel's burst timing
+        noise_rng, *self.event_rngs = rng.spawn(channels + 1)
+        self.normals = NormalPool(noise_rng, channels, sample_rate)
+        self.position = 0
+        # Next burst (start, end) per channel, drawn one event at a time
+        self.bursts = [self._next_burst(c, 0) for c in range(channels)]
+
+    def _next_burst(self, channel, after):
+        rng = self.event_rngs[channel]
+        start = after + int(rng.exponential(1.0 / self.rate) * self.sample_rate)
+        length = max(1, int(rng.exponential(self.duration) * self.sample_rate))
+        return start, start + length
+
+    def block(self, n):
+        out = self.normals.take(n) * self.std
+        gate = np.zeros(out.shape, dtype=bool)
+        block_end = self.position + n
+
+        for c in range(self.channels):
+            start, end = self.bursts[c]
+            while start < block_end:
+                gate[c, max(start, self.position) - self.position:
+                     min(end, block_end) - self.position] = True
+                if end > block_end:
+                    break
+                start, end = self._next_burst(c, end)
+            self.bursts[c] = (start, end)
+
+        self.position = block_end
+        return np.where(gate, out, 0.0)
+
+
+class NoiseGenerator:
+    def __init__(self, sample_rate, models=None, seed=None, channels=None):
+        """Sum of pluggable noise models driven by one seeded generator
+
+        Each model gets an independent child stream of
+        numpy.random.Generator, so adding a model does not change the
+        others. channels=None gives 1-D blocks.
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.models = []
+        for model in models if models is not None else [WhiteNoise()]:
+            self.add_model(model)
+
+    def add_model(self, model):
+        """Attach another noise model"""
+        child = self.seed_sequence.spawn(1)[0]
+        model.bind(self.sample_rate, self.channels or 1, np.random.default_rng(child))
+        self.models.append(model)
+        return model
+
+    def block(self, n):
+        """Next n samples of combined noise, (n,) or (channels, n)"""
+        total = np.zeros((self.channels or 1, n))
+        for model in self.models:
+            total += model.block(n)
+        return total[0] if self.channels is None else total
@@ -0,0 +1,222 @@
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from data import ECGDataGenerator
+from utils.ring_buffer import RingBuffer
+from utils.sim_clock import SimulationClock
+from recording.replay import RecordingSource, open_reader
+from analysis.filters import StreamingSOS, ecg_filter_sections
+
+# int64 header slots
+# WRITING is the total the writer is about to reach, TOTAL the one it has
+WRITING, TOTAL, TAIL, CAPACITY, OVERRUN = range(5)
+# float64 header slots
+SAMPLE_RATE, TARGET_HEART_RATE, DETECTED_HEART_RATE = range(3)
+
+INT_SLOTS = 8
+FLOAT_SLOTS = 8
+DATA_OFFSET = 8 * (INT_SLOTS + FLOAT_SLOTS)
+
+
+class SharedRingBuffer(RingBuffer):
+    def __init__(self, capacity=None, name=None):
+        """Mirrored float32 ring buffer in multiprocessing shared memory
+
+        Created by capacity, or attached to an existing block by name. One
+        process writes and one reads, without a lock. The only published
+        position is the total sample count, a single int64 store made
+        after the samples are in place; the reader derives the head from
+        it. Before writing, the writer also announces the total it is about
+        to reach, so the reader can tell which of the samples it copied
+        may have been overwritten meanwhile. The reader publishes its own
+        tail counter, plus a count of samples it lost that way or by
+        falling more than `capacity` behind.
+        """
+        self.owner = name is None
+        if self.owner:
+            size = DATA_OFFSET + 2 * capacity * np.dtype(np.float32).itemsize
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            # Attaching processes are spawned from the creator and share its
+            # resource tracker, so the block is unlinked exactly once
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.ints = np.ndarray((INT_SLOTS,), dtype=np.int64, buffer=self.shm.buf)
+        self.floats = np.ndarray((FLOAT_SLOTS,), dtype=np.float64, buffer=self.shm.buf,
+                                 offset=8 * INT_SLOTS)
+        if self.owner:
+            self.ints[:] = 0
+            self.floats[:] = 0.0
+            self.ints[CAPACITY] = capacity
+
+        self.capacity = int(self.ints[CAPACITY])
+        self.channels = None
+        self.dtype = np.dtype(np.float32)
+        self.data = np.ndarray((2 * self.capacity,), dtype=np.float32,
+                               buffer=self.shm.buf, offset=DATA_OFFSET)
+        if self.owner:
+            self.data.fill(0.0)
+
+        # Writer-side counters start from whatever was published
+        self.total_written = self.published()
+        self.head = self.total_written % self.capacity
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def extend(self, samples):
+        """Announce the write, write the samples, then publish the total"""
+        samples = np.asarray(samples, dtype=self.dtype).ravel()
+        self.ints[WRITING] = self.total_written + len(samples)
+        super().extend(samples)
+        self.ints[TOTAL] = self.total_written
+
+    def published(self):
+        """Total samples written, as last published by the writer"""
+        return int(self.ints[TOTAL])
+
+    def view(self, n=None):
+        """Read-only view of the newest published samples"""
+        if n is None or n > self.capacity:
+            n = self.capacity
+        end = self.published() % self.capacity + self.capacity
+        view = self.data[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def read_new(self):
+        """Copy samples published since the reader's tail, then advance it
+
+        If the reader fell more than `capacity` behind, or the writer
+        reached the oldest copied samples during the copy, those samples
+        are skipped and added to the published overrun count.
+        """
+        total = self.published()
+        tail = int(self.ints[TAIL])
+        count = min(total - tail, self.capacity)
+        end = total % self.capacity + self.capacity
+        new_samples = self.data[end - count:end].copy()
+
+        # Sample i shares its slot with sample i + capacity, so any copied
+        # sample below writing - capacity may have been overwritten
+        writing = int(self.ints[WRITING])
+        overwritten = min(count, max(0, writing - self.capacity - (total - count)))
+        new_samples = new_samples[overwritten:]
+        self.ints[OVERRUN] += (total - tail - count) + overwritten
+        self.ints[TAIL] = total
+        return new_samples
+
+    def overrun(self):
+        """Samples lost because the reader fell behind"""
+        return int(self.ints[OVERRUN])
+
+    def close(self):
+        """Detach, and free the block if this side created it"""
+        self.ints = self.floats = self.data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # Views handed out earlier are still alive; the mapping goes
+            # away when they do
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+
+def producer_main(name, sample_rate, heart_rate, recording, mains, stop_event):
+    """Producer process: generate, filter, detect and publish into shared memory"""
+    ring = SharedRingBuffer(name=name)
+
+    if recording:
+        source = RecordingSource(recording, mains=mains)
+    else:
+        filter_chain = None
+        if mains:
+            filter_chain = StreamingSOS(ecg_filter_sections(sample_rate, mains=mains))
+        source = ECGDataGenerator(sample_rate=sample_rate, heart_rate=heart_rate,
+                                  filter_chain=filter_chain)
+    clock = SimulationClock(source.sample_rate)
+    clock.start()
+
+    try:
+        while not stop_event.is_set():
+            target = ring.floats[TARGET_HEART_RATE]
+            if target and not recording and target != source.heart_rate:
+                source.heart_rate = target
+
+            samples_due = clock.tick()
+            if samples_due:
+                ring.extend(source.generate_block(samples_due))
+                ring.floats[DETECTED_HEART_RATE] = source.calculate_heart_rate()
+            time.sleep(0.002)
+    finally:
+        ring.close()
+
+
+class SharedMemorySource:
+    def __init__(self, sample_rate=250, heart_rate=72, recording=None, seconds=20,
+                 mains=None):
+        """Run generation and analysis in a separate process
+
+        Exposes the ECGDataGenerator surface to the render loop, but
+        generate_block() only picks up what the producer has published;
+        the render process never generates or analyses samples itself.
+        """
+        if recording:
+            sample_rate = open_reader(recording).sample_rate
+        self.sample_rate = sample_rate
+        self.capacity = int(sample_rate * seconds)
+        self.display_size = int(sample_rate * 10)
+
+        self.ring = SharedRingBuffer(capacity=self.capacity)
+        self.ring.floats[SAMPLE_RATE] = sample_rate
+        self.ring.floats[TARGET_HEART_RATE] = heart_rate
+        self.ring.floats[DETECTED_HEART_RATE] = heart_rate
+
+        context = mp.get_context("spawn")
+        self.stop_event = context.Event()
+        self.process = context.Process(
+            target=producer_main,
+            args=(self.ring.name, sample_rate, heart_rate,
+                  recording, mains, self.stop_event))
+        self.process.daemon = True
+        self.process.start()
+
+    @property
+    def heart_rate(self):
+        return int(self.ring.floats[TARGET_HEART_RATE])
+
+    @heart_rate.setter
+    def heart_rate(self, value):
+        self.ring.floats[TARGET_HEART_RATE] = value
+
+    def generate_block(self, n=None):
+        """Samples published since the last call (n is ignored)"""
+        return self.ring.read_new()
+
+    def update(self):
+        """Pick up published samples, return the newest"""
+        new_samples = self.generate_block()
+        return float(new_samples[-1]) if len(new_samples) else 0.0
+
+    def get_display_data(self):
+        """Newest 10 s straight from shared memory (no copy)"""
+        return self.ring.view(self.display_size)
+
+    def calculate_heart_rate(self):
+        """Heart rate detected by the producer process"""
+        return int(self.ring.floats[DETECTED_HEART_RATE])
+
+    def overrun(self):
+        """Samples the render loop missed because it fell behind"""
+        return self.ring.overrun()
+
+    def close(self):
+        """Stop the producer and free the shared block"""
+        self.stop_event.set()
+        self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
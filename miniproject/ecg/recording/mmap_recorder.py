@@ -0,0 +1,197 @@
+import threading
+import time
+import numpy as np
+
+MAGIC = b"ECGREC01"
+HEADER_SIZE = 4096
+
+# Fixed header at the start of every recording file
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("channels", "<u4"),
+    ("sample_rate", "<f8"),
+    ("storage", "S8"),            # b"float32" or b"int16"
+    ("gain", "<f8"),              # ADC counts per mV (int16 storage)
+    ("baseline", "<f8"),          # ADC count that maps to 0 mV
+    ("capacity", "<u8"),          # Preallocated samples per channel
+    ("index_interval", "<u8"),    # Samples between index entries
+    ("index_capacity", "<u8"),
+    ("samples_written", "<u8"),
+    ("start_time", "<f8"),        # Wall clock at first sample
+])
+
+# Periodic index entry: absolute sample number and wall-clock time
+INDEX_DTYPE = np.dtype([("sample", "<u8"), ("time", "<f8")])
+
+STORAGE_DTYPES = {b"float32": np.float32, b"int16": np.int16}
+
+
+class ECGRecorder:
+    def __init__(self, path, sample_rate, channels=1, capacity_seconds=24 * 3600,
+                 storage="float32", gain=1000.0, baseline=0.0,
+                 index_interval=10.0, flush_interval=1.0):
+        """Append sample blocks to a preallocated memory-mapped file
+
+        Layout: fixed header, index table (one entry every index_interval
+        seconds), then a frame-major payload (samples x channels). Appends
+        are plain memory copies; a daemon thread flushes dirty pages every
+        flush_interval seconds so the caller never waits on disk I/O.
+        """
+        storage_key = storage.encode()
+        if storage_key not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported storage: {storage}")
+
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.capacity = int(capacity_seconds * sample_rate)
+        self.index_interval = max(1, int(index_interval * sample_rate))
+        index_capacity = self.capacity // self.index_interval + 1
+        self.storage_dtype = np.dtype(STORAGE_DTYPES[storage_key])
+        self.gain = gain
+        self.baseline = baseline
+
+        index_offset = HEADER_SIZE
+        payload_offset = index_offset + index_capacity * INDEX_DTYPE.itemsize
+        file_size = payload_offset + self.capacity * channels * self.storage_dtype.itemsize
+
+        # Sparse preallocation of the whole file
+        with open(path, "wb") as file:
+            file.truncate(file_size)
+
+        self.header = np.memmap(path, dtype=HEADER_DTYPE, mode="r+", shape=(1,))
+        self.index = np.memmap(path, dtype=INDEX_DTYPE, mode="r+",
+                               offset=index_offset, shape=(index_capacity,))
+        self.payload = np.memmap(path, dtype=self.storage_dtype, mode="r+",
+                                 offset=payload_offset, shape=(self.capacity, channels))
+
+        self.header["magic"] = MAGIC
+        self.header["version"] = 1
+        self.header["channels"] = channels
+        self.header["sample_rate"] = sample_rate
+        self.header["storage"] = storage_key
+        self.header["gain"] = gain
+        self.header["baseline"] = baseline
+        self.header["capacity"] = self.capacity
+        self.header["index_interval"] = self.index_interval
+        self.header["index_capacity"] = index_capacity
+        self.header["samples_written"] = 0
+        self.header["start_time"] = 0.0
+        self.header.flush()
+
+        self.samples_written = 0
+        self.dropped_samples = 0
+
+        # Background flushing
+        self.flush_interval = flush_interval
+        self.is_recording = True
+        self.flush_thread = threading.Thread(target=self.flush_loop)
+        self.flush_thread.daemon = True
+        self.flush_thread.start()
+
+    def append(self, block):
+        """Append a (n,) or (channels, n) block, returns samples written"""
+        block = np.asarray(block, dtype=np.float32).reshape(self.channels, -1)
+        n = block.shape[1]
+        now = time.time()
+        if self.samples_written == 0 and n:
+            self.header["start_time"] = now
+
+        room = self.capacity - self.samples_written
+        if n > room:
+            self.dropped_samples += n - room
+            block = block[:, :room]
+            n = room
+        if n == 0:
+            return 0
+
+        start = self.samples_written
+        if self.storage_dtype == np.int16:
+            counts = np.rint(block * self.gain + self.baseline)
+            self.payload[start:start + n] = np.clip(counts, -32768, 32767).T
+        else:
+            self.payload[start:start + n] = block.T
+
+        # Index entries for every interval boundary inside this block
+        first_entry = -(-start // self.index_interval)
+        last_entry = (start + n - 1) // self.index_interval
+        for entry in range(first_entry, last_entry + 1):
+            sample = entry * self.index_interval
+            self.index[entry] = (sample, now - (start + n - sample) / self.sample_rate)
+
+        self.samples_written += n
+        self.header["samples_written"] = self.samples_written
+        return n
+
+    def flush_loop(self):
+        """Flush dirty pages periodically"""
+        while self.is_recording:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write pending changes to disk"""
+        self.payload.flush()
+        self.index.flush()
+        self.header.flush()
+
+    def close(self):
+        """Stop the flush thread and finalize the file"""
+        self.is_recording = False
+        if self.flush_thread:
+            self.flush_thread.join(timeout=self.flush_interval + 1.0)
+        self.flush()
+
+
+class RecordingFile:
+    def __init__(self, path):
+        """Read-only access to a file written by ECGRecorder
+
+        Any offset is read in O(1) straight from the memory map; only the
+        requested samples are touched.
+        """
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)[0]
+        if header["magic"] != MAGIC:
+            raise ValueError(f"Not an ECG recording: {path}")
+
+        self.path = path
+        self.channels = int(header["channels"])
+        self.sample_rate = float(header["sample_rate"])
+        self.gain = float(header["gain"])
+        self.baseline = float(header["baseline"])
+        self.start_time = float(header["start_time"])
+        self.storage_dtype = np.dtype(STORAGE_DTYPES[bytes(header["storage"])])
+        self.index_interval = int(header["index_interval"])
+        capacity = int(header["capacity"])
+        index_capacity = int(header["index_capacity"])
+
+        payload_offset = HEADER_SIZE + index_capacity * INDEX_DTYPE.itemsize
+        self.header = np.memmap(path, dtype=HEADER_DTYPE, mode="r", shape=(1,))
+        self.index = np.memmap(path, dtype=INDEX_DTYPE, mode="r",
+                               offset=HEADER_SIZE, shape=(index_capacity,))
+        self.payload = np.memmap(path, dtype=self.storage_dtype, mode="r",
+                                 offset=payload_offset, shape=(capacity, self.channels))
+
+    @property
+    def samples_written(self):
+        """Samples recorded so far (live while the recorder is running)"""
+        return int(self.header["samples_written"][0])
+
+    def read(self, start, count):
+        """(channels, count) float32 mV starting at absolute sample `start`"""
+        start = max(0, int(start))
+        stop = min(start + int(count), self.samples_written)
+        frames = self.payload[start:max(start, stop)]
+        if self.storage_dtype == np.int16:
+            return ((frames.T.astype(np.float32) - self.baseline) / self.gain)
+        return np.array(frames.T, dtype=np.float32)
+
+    def read_seconds(self, offset, duration):
+        """Read by time offset (seconds from the first sample)"""
+        return self.read(offset * self.sample_rate, duration * self.sample_rate)
+
+    def wall_time(self, sample):
+        """Wall-clock time of a sample, from the nearest preceding index entry"""
+        entry = self.index[int(sample) // self.index_interval]
+        return float(entry["time"]) + (sample - int(entry["sample"])) / self.sample_rate
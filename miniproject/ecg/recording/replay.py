@@ -0,0 +1,249 @@
+import io
+import mmap
+import os
+import numpy as np
+from utils.ring_buffer import RingBuffer
+from analysis.pan_tompkins import PanTompkinsDetector
+from analysis.filters import StreamingSOS, ecg_filter_sections
+from analysis.beat_features import BeatAnalyzer
+from analysis.hrv import HRVTracker
+
+
+class WFDBReader:
+    def __init__(self, header_path, channel=0):
+        """Stream one signal of a WFDB record (format 212 or 16)
+
+        The .dat file is memory-mapped and only the requested frames are
+        decoded, so records of any length open instantly.
+        """
+        with open(header_path, "r") as file:
+            lines = [line.strip() for line in file
+                     if line.strip() and not line.startswith("#")]
+
+        record = lines[0].split()
+        num_signals = int(record[1])
+        self.sample_rate = float(record[2].split("/")[0].split("(")[0]) if len(record) > 2 else 250.0
+
+        signals = [line.split() for line in lines[1:1 + num_signals]]
+        if isinstance(channel, str):
+            names = [" ".join(fields[8:]) for fields in signals]
+            channel = names.index(channel)
+        fields = signals[channel]
+
+        self.format = fields[1].split("x")[0].split(":")[0].split("+")[0]
+        if self.format not in ("212", "16"):
+            raise ValueError(f"Unsupported WFDB format: {fields[1]}")
+
+        # Signals stored in the same .dat file are interleaved frame by frame
+        file_name = fields[0]
+        in_file = [i for i, other in enumerate(signals) if other[0] == file_name]
+        self.signals_in_file = len(in_file)
+        self.signal_offset = in_file.index(channel)
+
+        self.gain, self.baseline = self._parse_gain(fields)
+
+        dat_path = os.path.join(os.path.dirname(header_path), file_name)
+        size = os.path.getsize(dat_path)
+        if self.format == "16":
+            self.data = np.memmap(dat_path, dtype="<i2", mode="r")
+        else:
+            with open(dat_path, "rb") as file:
+                self.mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.data = np.frombuffer(self.mapping, dtype=np.uint8)
+
+        stored = size // 2 if self.format == "16" else size * 2 // 3
+        self.num_frames = stored // self.signals_in_file
+        if len(record) > 3 and int(record[3]) > 0:
+            self.num_frames = min(self.num_frames, int(record[3]))
+
+    @staticmethod
+    def _parse_gain(fields):
+        """ADC gain (counts per mV) and baseline from a signal spec line"""
+        adc_zero = int(fields[4]) if len(fields) > 4 else 0
+        if len(fields) < 3:
+            return 200.0, float(adc_zero)
+        spec = fields[2].split("/")[0]
+        baseline = adc_zero
+        if "(" in spec:
+            spec, baseline = spec.rstrip(")").split("(")
+        gain = float(spec) or 200.0
+        return gain, float(baseline)
+
+    def read_frames(self, start, count):
+        """Physical values (mV) of frames [start, start + count)"""
+        stop = min(start + count, self.num_frames)
+        if stop <= start:
+            return np.empty(0, dtype=np.float32)
+
+        flat_start = start * self.signals_in_file
+        flat_stop = stop * self.signals_in_file
+        if self.format == "16":
+            flat = self.data[flat_start:flat_stop]
+        else:
+            flat = self._decode_212(flat_start, flat_stop)
+
+        counts = flat[self.signal_offset::self.signals_in_file].astype(np.float32)
+        return (counts - self.baseline) / self.gain
+
+    def _decode_212(self, flat_start, flat_stop):
+        """Unpack 12-bit samples, two per three bytes"""
+        first_pair = flat_start // 2
+        last_pair = (flat_stop + 1) // 2
+        raw = self.data[first_pair * 3:last_pair * 3]
+        if len(raw) % 3:
+            # Odd sample count: the final pair is stored as a 2-byte half-triple
+            raw = np.concatenate((raw, np.zeros(3 - len(raw) % 3, dtype=np.uint8)))
+        packed = raw.reshape(-1, 3).astype(np.int16)
+
+        pairs = np.empty((len(packed), 2), dtype=np.int16)
+        pairs[:, 0] = packed[:, 0] | ((packed[:, 1] & 0x0F) << 8)
+        pairs[:, 1] = packed[:, 2] | ((packed[:, 1] & 0xF0) << 4)
+        pairs[pairs > 2047] -= 4096
+
+        flat = pairs.ravel()
+        offset = flat_start - first_pair * 2
+        return flat[offset:offset + flat_stop - flat_start]
+
+
+class CSVReader:
+    def __init__(self, path, sample_rate=250.0, column=0, chunk_bytes=1 << 16):
+        """Stream one column of a large CSV file in chunks
+
+        The file is memory-mapped and decoded chunk_bytes at a time, on
+        whole lines, as samples are requested. A non-numeric first line is
+        taken as a header naming the columns.
+        """
+        self.sample_rate = sample_rate
+        self.chunk_bytes = chunk_bytes
+        self.file = open(path, "rb")
+        self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        first_line_end = self.mapping.find(b"\n")
+        first_line = self.mapping[:first_line_end if first_line_end >= 0 else None].decode().strip()
+        cells = [cell.strip() for cell in first_line.split(",")]
+        try:
+            [float(cell) for cell in cells]
+            self.data_start = 0
+        except ValueError:
+            self.data_start = first_line_end + 1
+            if isinstance(column, str):
+                column = cells.index(column)
+        self.column = column
+
+        # Sequential decode state
+        self.byte_position = self.data_start
+        self.decoded = np.empty(0, dtype=np.float32)
+        self.frame = 0           # Frame index of decoded[0]
+        self.num_frames = None   # Unknown until the end is reached
+
+    def _decode_chunk(self):
+        """Decode the next run of whole lines, returns False at end of file"""
+        end = len(self.mapping)
+        if self.byte_position >= end:
+            return False
+
+        stop = min(self.byte_position + self.chunk_bytes, end)
+        if stop < end:
+            # Cut on a line boundary; a line longer than a chunk is taken whole
+            newline = self.mapping.rfind(b"\n", self.byte_position, stop)
+            if newline < 0:
+                newline = self.mapping.find(b"\n", stop)
+            stop = newline + 1 if newline >= 0 else end
+
+        text = self.mapping[self.byte_position:stop].decode()
+        self.byte_position = stop
+        values = np.loadtxt(io.StringIO(text), delimiter=",", usecols=self.column,
+                            dtype=np.float32, ndmin=1)
+        self.decoded = np.concatenate((self.decoded, values))
+        return True
+
+    def read_frames(self, start, count):
+        """Values of frames [start, start + count); reads must move forward
+        (or restart at 0)"""
+        if start < self.frame:
+            self.byte_position = self.data_start
+            self.decoded = np.empty(0, dtype=np.float32)
+            self.frame = 0
+
+        # Drop frames that were already consumed
+        skip = min(start - self.frame, len(self.decoded))
+        self.decoded = self.decoded[skip:]
+        self.frame += skip
+
+        while self.frame + len(self.decoded) < start + count and self._decode_chunk():
+            pass
+        if self.byte_position >= len(self.mapping):
+            self.num_frames = self.frame + len(self.decoded)
+
+        offset = start - self.frame
+        return self.decoded[max(0, offset):max(0, offset) + count]
+
+
+def open_reader(path, channel=0, sample_rate=250.0):
+    """Reader for a WFDB header (.hea) or a CSV file"""
+    if path.endswith(".hea"):
+        return WFDBReader(path, channel)
+    return CSVReader(path, sample_rate=sample_rate, column=channel)
+
+
+class RecordingSource:
+    def __init__(self, path, channel=0, sample_rate=250.0, loop=True, mains=None):
+        """Replay a recorded ECG through the ECGDataGenerator interface
+
+        Samples are pulled from the reader only as the display needs them.
+        sample_rate is only used for CSV files; WFDB headers carry their own.
+        mains (50 or 60 Hz) enables the baseline/notch/low-pass filter chain.
+        """
+        self.reader = open_reader(path, channel, sample_rate)
+        self.sample_rate = self.reader.sample_rate
+        self.loop = loop
+        self.position = 0
+        self.heart_rate = 72   # Shown until beats are detected
+
+        # Buffer for display data (10 seconds)
+        self.buffer_size = int(self.sample_rate * 10)
+        self.ecg_buffer = RingBuffer(self.buffer_size, fill=0.0)
+        self.peak_detector = PanTompkinsDetector(int(round(self.sample_rate)))
+        self.beat_analyzer = BeatAnalyzer(self.sample_rate)
+        self.hrv = HRVTracker()
+
+        self.filter_chain = None
+        if mains:
+            self.filter_chain = StreamingSOS(ecg_filter_sections(self.sample_rate, mains=mains))
+
+    def generate_block(self, n):
+        """Read the next n samples of the recording"""
+        parts = []
+        remaining = n
+        while remaining > 0:
+            block = self.reader.read_frames(self.position, remaining)
+            self.position += len(block)
+            remaining -= len(block)
+            parts.append(block)
+            if len(block) == 0:
+                if not self.loop or self.position == 0:
+                    break
+                self.position = 0
+
+        new_samples = np.concatenate(parts) if parts else np.empty(0, dtype=np.float32)
+        if self.filter_chain is not None:
+            new_samples = self.filter_chain.process(new_samples)[0].astype(np.float32)
+        self.ecg_buffer.extend(new_samples)
+        peaks = self.peak_detector.process(new_samples)
+        new_beats = self.beat_analyzer.process(new_samples, peaks)
+        self.hrv.extend(new_beats["time"], new_beats["rr"])
+        self.hrv.update(self.beat_analyzer.samples_seen / self.sample_rate)
+        return new_samples
+
+    def update(self):
+        """Read the next sample"""
+        block = self.generate_block(1)
+        return float(block[0]) if len(block) else 0.0
+
+    def get_display_data(self):
+        """Get ECG data for display (read-only view, valid until next update)"""
+        return self.ecg_buffer.view()
+
+    def calculate_heart_rate(self):
+        """Calculate heart rate from R-wave detection"""
+        return self.peak_detector.heart_rate(default=self.heart_rate)
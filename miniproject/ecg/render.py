@@ -1,11 +1,23 @@
+import ctypes
+import os
 import OpenGL.GL as gl
 import numpy as np
 import math
+from utils.decimation import EnvelopeDecimator
+from utils.shader_loader import create_shader_program
+from utils.math_utils import create_projection_matrix, create_view_matrix
+
+# Interleaved vertex layout matching shaders/vertex_shader.glsl
+VERTEX_DTYPE = np.dtype([("position", np.float32, 2), ("color", np.float32, 3)])
 
 
 class ECGRenderer:
     def __init__(self, width, height):
-        """Initialize ECG renderer using immediate mode OpenGL"""
+        """Initialize ECG renderer for a GL 2.1 compatibility context
+
+        Grid and indicators use immediate mode; traces are submitted as
+        NumPy vertex arrays with a single glDrawArrays call.
+        """
         self.width = width
         self.height = height
 
@@ -14,12 +26,22 @@ class ECGRenderer:
         self.voltage_scale = 150.0
         self.scroll_speed = 1.0
 
+        # Below one pixel per sample the trace is drawn from a min/max
+        # envelope ("minmax" or "lttb"), at most 2 vertices per column
+        self.decimation = "minmax"
+        self.decimator = None
+
         # Colors (RGB)
         self.bg_color = (0.02, 0.02, 0.08)      # Dark blue
         self.major_grid_color = (0.2, 0.3, 0.2)  # Green grid
         self.minor_grid_color = (0.1, 0.15, 0.1)  # Darker green
         self.ecg_color = (0.0, 1.0, 0.2)         # Bright green
 
+        # Grid line spacing (minor, major) in logical pixels, scaled by
+        # dpi_scale on high-density displays (shader backend)
+        self.grid_spacing = (10, 50)
+        self.dpi_scale = 1.0
+
         # Setup OpenGL for immediate mode
         self.setup_opengl()
 
@@ -76,33 +98,71 @@ class ECGRenderer:
 
         gl.glEnd()
 
-    def draw_ecg_waveform(self, ecg_data):
-        """Draw ECG waveform using immediate mode"""
-        if not ecg_data or len(ecg_data) < 2:
+    def set_dpi_scale(self, scale):
+        """Set the display content scale (e.g. from glfw.get_window_content_scale)"""
+        self.dpi_scale = scale
+
+    def push_samples(self, samples):
+        """Feed newly generated samples to the display decimator"""
+        if self.decimator is not None:
+            self.decimator.push(samples)
+
+    def draw_decimated_waveform(self, ecg_data):
+        """Draw the min/max envelope of the visible window"""
+        if self.decimator is None:
+            # (Re)build from the display buffer, then keep up via push_samples
+            samples_per_column = round(1.0 / self.samples_per_pixel)
+            self.decimator = EnvelopeDecimator(self.width, samples_per_column, self.decimation)
+            self.decimator.push(ecg_data[-self.width * samples_per_column:])
+
+        xs, ys = self.decimator.vertices()
+        self.draw_line_strip(xs, ys, 2.5)
+
+    def draw_envelope(self, times, mins, maxs, start_time, end_time):
+        """Draw min/max history (from HistoryPyramid.query) with
+        [start_time, end_time) seconds spanning the window width"""
+        if len(mins) < 2:
             return
 
-        center_y = self.height // 2
+        scale = self.width / (end_time - start_time)
+        xs = np.repeat((np.asarray(times) - start_time) * scale, 2)
+        values = np.stack((mins, maxs), axis=1).ravel()
+        self.draw_line_strip(xs, values, 1.5)
 
-        # Calculate how many samples to display
-        samples_to_show = int(self.width / self.samples_per_pixel)
-        start_idx = max(0, len(ecg_data) - samples_to_show)
+    def trace_points(self, xs, values):
+        """(n, 2) float32 screen coordinates of a trace, y clamped to the window"""
+        points = np.empty((len(xs), 2), dtype=np.float32)
+        points[:, 0] = xs
+        np.multiply(values, self.voltage_scale, out=points[:, 1])
+        points[:, 1] += self.height // 2
+        np.clip(points[:, 1], 5, self.height - 5, out=points[:, 1])
+        return points
 
-        # Draw ECG waveform
-        gl.glColor3f(*self.ecg_color)
-        gl.glLineWidth(2.5)
-        gl.glBegin(gl.GL_LINE_STRIP)
+    def draw_line_strip(self, xs, values, width):
+        """Draw a trace from one client-side vertex array (GL 1.1, no shaders)"""
+        points = self.trace_points(xs, values)
 
-        for i in range(start_idx, len(ecg_data)):
-            # Calculate screen coordinates
-            x = (i - start_idx) * self.samples_per_pixel
-            y = center_y + (ecg_data[i] * self.voltage_scale)
+        gl.glColor3f(*self.ecg_color)
+        gl.glLineWidth(width)
+        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glVertexPointer(2, gl.GL_FLOAT, 0, points)
+        gl.glDrawArrays(gl.GL_LINE_STRIP, 0, len(points))
+        gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
 
-            # Clamp Y to screen bounds
-            y = max(5, min(self.height - 5, y))
+    def draw_ecg_waveform(self, ecg_data):
+        """Draw the visible window of ECG samples"""
+        if ecg_data is None or len(ecg_data) < 2:
+            return
 
-            gl.glVertex2f(x, y)
+        if self.decimation and self.samples_per_pixel < 1.0:
+            self.draw_decimated_waveform(ecg_data)
+            return
 
-        gl.glEnd()
+        # Calculate how many samples to display
+        samples_to_show = int(self.width / self.samples_per_pixel)
+        visible = ecg_data[-samples_to_show:]
+        xs = np.arange(len(visible), dtype=np.float32) * self.samples_per_pixel
+        self.draw_line_strip(xs, visible, 2.5)
 
     def draw_info_text(self, heart_rate, audio_status):
         """Draw information text (simplified - just colored rectangles for now)"""
@@ -128,8 +188,12 @@ class ECGRenderer:
         gl.glVertex2f(110, self.height - 10)
         gl.glEnd()
 
-    def render(self, ecg_data, heart_rate, audio_status=True):
-        """Render complete ECG display"""
+    def render(self, ecg_data, heart_rate, audio_status=True, envelope=None):
+        """Render complete ECG display
+
+        envelope, if given, is draw_envelope's arguments and replaces the
+        live trace (long-term review).
+        """
         # Clear screen
         gl.glClearColor(*self.bg_color, 1.0)
         gl.glClear(gl.GL_COLOR_BUFFER_BIT)
@@ -137,16 +201,24 @@ class ECGRenderer:
         # Draw grid
         self.draw_grid()
 
-        # Draw ECG waveform
-        self.draw_ecg_waveform(ecg_data)
+        # Draw ECG waveform, or the history envelope when reviewing
+        if envelope is not None:
+            self.draw_envelope(*envelope)
+        else:
+            self.draw_ecg_waveform(ecg_data)
 
         # Draw info indicators
         self.draw_info_text(heart_rate, audio_status)
 
+    def reset(self):
+        """Forget trace state built from earlier samples"""
+        self.decimator = None
+
     def resize(self, width, height):
         """Handle window resize"""
         self.width = width
         self.height = height
+        self.reset()
 
         gl.glViewport(0, 0, width, height)
 
@@ -157,3 +229,348 @@ class ECGRenderer:
 
         gl.glMatrixMode(gl.GL_MODELVIEW)
         gl.glLoadIdentity()
+
+
+class VertexBuffer:
+    def __init__(self, usage=gl.GL_STREAM_DRAW):
+        """VAO + VBO of interleaved (x, y, r, g, b) float32 vertices
+
+        Laid out for the shipped shaders (location 0: position, 1: color).
+        The buffer is only reallocated when the vertex count grows;
+        otherwise uploads go through glBufferSubData.
+        """
+        self.usage = usage
+        self.count = 0
+        self.capacity = 0
+        self.vao = gl.glGenVertexArrays(1)
+        self.vbo = gl.glGenBuffers(1)
+
+        gl.glBindVertexArray(self.vao)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+        stride = VERTEX_DTYPE.itemsize
+        gl.glEnableVertexAttribArray(0)
+        gl.glVertexAttribPointer(0, 2, gl.GL_FLOAT, gl.GL_FALSE, stride, ctypes.c_void_p(0))
+        gl.glEnableVertexAttribArray(1)
+        gl.glVertexAttribPointer(1, 3, gl.GL_FLOAT, gl.GL_FALSE, stride, ctypes.c_void_p(8))
+        gl.glBindVertexArray(0)
+
+    def upload(self, vertices):
+        """Replace the contents with a (n,) VERTEX_DTYPE array"""
+        self.count = len(vertices)
+        if self.count == 0:
+            return
+        # PyOpenGL wants a plain float array, not a structured one
+        vertices = vertices.view(np.float32)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+        if self.count > self.capacity:
+            self.capacity = self.count
+            gl.glBufferData(gl.GL_ARRAY_BUFFER, vertices.nbytes, vertices, self.usage)
+        else:
+            gl.glBufferSubData(gl.GL_ARRAY_BUFFER, 0, vertices.nbytes, vertices)
+
+    def write(self, offset, vertices):
+        """Overwrite vertices [offset, offset + n) in place"""
+        if len(vertices) == 0:
+            return
+        vertices = vertices.view(np.float32)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+        gl.glBufferSubData(gl.GL_ARRAY_BUFFER, offset * VERTEX_DTYPE.itemsize,
+                           vertices.nbytes, vertices)
+
+    def draw(self, mode, first=0, count=None):
+        """Draw uploaded vertices [first, first + count) in one call"""
+        if count is None:
+            count = self.count - first
+        if count <= 0:
+            return
+        gl.glBindVertexArray(self.vao)
+        gl.glDrawArrays(mode, first, count)
+
+    def delete(self):
+        gl.glDeleteBuffers(1, [self.vbo])
+        gl.glDeleteVertexArrays(1, [self.vao])
+
+
+def make_vertices(points, color):
+    """Interleave (n, 2) positions and one RGB color into VERTEX_DTYPE"""
+    vertices = np.empty(len(points), dtype=VERTEX_DTYPE)
+    vertices["position"] = points
+    vertices["color"] = color
+    return vertices
+
+
+class ShaderECGRenderer(ECGRenderer):
+    def __init__(self, width, height):
+        """ECG renderer drawing from VBOs with the shipped GLSL shaders
+
+        Needs an OpenGL 3.3 core context. The grid is computed per pixel
+        in a fragment shader from uniforms, so it has no geometry and
+        stays sharp at any size; the trace is rebuilt with NumPy and
+        uploaded as one buffer per frame, so a frame costs a handful of
+        GL calls no matter how many samples are visible.
+
+        display_mode "sweep" keeps the trace in a fixed buffer instead and
+        overwrites only newly pushed samples each frame, behind a moving
+        erase gap of sweep_gap pixels, as bedside monitors do.
+
+        display_mode "ring" keeps raw samples in a GPU ring (buffer
+        texture) and the vertex shader places them from gl_VertexID and a
+        head uniform, so scrolling costs one uniform update plus the
+        upload of new samples, whatever the window length.
+        """
+        self.display_mode = "scroll"
+        self.sweep_gap = 20
+        self.sweep_size = 0        # Vertices in the sweep buffer (0: rebuild)
+        self.sweep_position = 0    # Next vertex to overwrite
+        self.ring_capacity = 0     # Samples in the GPU ring (0: rebuild)
+        self.ring_position = 0     # Next ring slot to write
+        self.ring_filled = 0       # Valid samples in the ring
+        super().__init__(width, height)
+
+    def setup_opengl(self):
+        """Compile the shader program and create the vertex buffers"""
+        shader_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shaders")
+        self.program = create_shader_program(
+            os.path.join(shader_dir, "vertex_shader.glsl"),
+            os.path.join(shader_dir, "fragment_shader.glsl"))
+        self.projection_location = gl.glGetUniformLocation(self.program, "projection")
+        self.view_location = gl.glGetUniformLocation(self.program, "view")
+
+        # The grid is drawn procedurally by a full-screen fragment shader;
+        # core profiles still need a (here empty) VAO bound to draw
+        self.grid_program = create_shader_program(
+            os.path.join(shader_dir, "grid_vertex_shader.glsl"),
+            os.path.join(shader_dir, "grid_fragment_shader.glsl"))
+        self.empty_vao = gl.glGenVertexArrays(1)
+
+        # Sample ring for "ring" mode: a float buffer read as a buffer texture
+        self.ring_program = create_shader_program(
+            os.path.join(shader_dir, "ring_vertex_shader.glsl"),
+            os.path.join(shader_dir, "fragment_shader.glsl"))
+        self.ring_uniforms = {
+            name: gl.glGetUniformLocation(self.ring_program, name)
+            for name in ("samples", "capacity", "head", "x_offset", "x_scale", "y_center",
+                         "y_scale", "y_range", "color", "projection", "view")
+        }
+        self.ring_buffer = gl.glGenBuffers(1)
+        self.ring_texture = gl.glGenTextures(1)
+
+        self.trace_buffer = VertexBuffer()
+        self.sweep_buffer = VertexBuffer(gl.GL_DYNAMIC_DRAW)
+        self.info_buffer = VertexBuffer()
+
+        # Core profiles may only support 1 px lines
+        low, high = gl.glGetFloatv(gl.GL_ALIASED_LINE_WIDTH_RANGE)
+        self.line_width_range = (float(low), float(high))
+
+        gl.glEnable(gl.GL_BLEND)
+        gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+
+        self.update_grid_uniforms()
+        self.update_matrices()
+
+    def update_grid_uniforms(self):
+        """Upload grid spacing, width and colors (they persist in the program)"""
+        gl.glUseProgram(self.grid_program)
+        minor, major = self.grid_spacing
+        uniforms = {
+            "spacing": (minor * self.dpi_scale, major * self.dpi_scale),
+            "line_width": (max(1.0, round(self.dpi_scale)),),
+            "background": self.bg_color,
+            "minor_color": self.minor_grid_color,
+            "major_color": self.major_grid_color,
+        }
+        setters = {1: gl.glUniform1f, 2: gl.glUniform2f, 3: gl.glUniform3f}
+        for name, value in uniforms.items():
+            setters[len(value)](gl.glGetUniformLocation(self.grid_program, name), *value)
+
+    def set_dpi_scale(self, scale):
+        """Set the display content scale and rescale the grid"""
+        self.dpi_scale = scale
+        self.update_grid_uniforms()
+
+    def update_matrices(self):
+        """Upload the pixel-space projection for the current size"""
+        gl.glUseProgram(self.program)
+        # Matrices are row-major NumPy arrays, hence transpose=GL_TRUE
+        gl.glUniformMatrix4fv(self.projection_location, 1, gl.GL_TRUE,
+                              create_projection_matrix(self.width, self.height))
+        gl.glUniformMatrix4fv(self.view_location, 1, gl.GL_TRUE, create_view_matrix())
+
+        gl.glUseProgram(self.ring_program)
+        gl.glUniformMatrix4fv(self.ring_uniforms["projection"], 1, gl.GL_TRUE,
+                              create_projection_matrix(self.width, self.height))
+        gl.glUniformMatrix4fv(self.ring_uniforms["view"], 1, gl.GL_TRUE, create_view_matrix())
+        gl.glUseProgram(self.program)
+
+    def set_line_width(self, width):
+        low, high = self.line_width_range
+        gl.glLineWidth(max(low, min(high, width)))
+
+    def draw_grid(self):
+        """Draw the grid (and background) as one full-screen triangle"""
+        gl.glUseProgram(self.grid_program)
+        gl.glBindVertexArray(self.empty_vao)
+        gl.glDrawArrays(gl.GL_TRIANGLES, 0, 3)
+        gl.glUseProgram(self.program)
+
+    def draw_line_strip(self, xs, values, width):
+        """Upload and draw one trace as a line strip"""
+        points = self.trace_points(xs, values)
+        self.trace_buffer.upload(make_vertices(points, self.ecg_color))
+        self.set_line_width(width)
+        self.trace_buffer.draw(gl.GL_LINE_STRIP)
+
+    def push_samples(self, samples):
+        """Feed new samples to the decimator, or write them into the sweep"""
+        super().push_samples(samples)
+        if self.display_mode == "sweep" and self.sweep_size:
+            self.write_sweep(np.ravel(samples))
+        elif self.display_mode == "ring" and self.ring_capacity:
+            self.write_ring(np.ravel(samples))
+
+    def write_sweep(self, samples):
+        """Overwrite the vertices at the sweep position (at most two writes)"""
+        samples = samples[-self.sweep_size:]
+        position = self.sweep_position
+        while len(samples):
+            count = min(len(samples), self.sweep_size - position)
+            xs = (position + np.arange(count)) * self.samples_per_pixel
+            points = self.trace_points(xs, samples[:count])
+            self.sweep_buffer.write(position, make_vertices(points, self.ecg_color))
+            samples = samples[count:]
+            position = (position + count) % self.sweep_size
+        self.sweep_position = position
+
+    def draw_sweep(self, ecg_data):
+        """Draw the sweep trace with an erase gap ahead of the newest sample"""
+        # A narrow display buffer may hold fewer samples than fit across
+        size = min(int(self.width / self.samples_per_pixel), len(ecg_data))
+        if size != self.sweep_size:
+            # (Re)build from the display buffer, restarting at the left edge
+            visible = ecg_data[-size:]
+            xs = np.arange(size) * self.samples_per_pixel
+            self.sweep_buffer.upload(make_vertices(self.trace_points(xs, visible),
+                                                   self.ecg_color))
+            self.sweep_size = size
+            self.sweep_position = 0
+
+        gap = int(self.sweep_gap / self.samples_per_pixel)
+        self.set_line_width(2.5)
+        # Newest samples up to the sweep position, then the older ones after
+        # the gap; near the right edge the gap wraps onto the left
+        position = self.sweep_position
+        wrapped = max(0, position + gap - self.sweep_size)
+        self.sweep_buffer.draw(gl.GL_LINE_STRIP, wrapped, position - wrapped)
+        self.sweep_buffer.draw(gl.GL_LINE_STRIP, position + gap)
+
+    def write_ring(self, samples):
+        """Append raw samples to the GPU ring (at most two sub-buffer writes)"""
+        samples = np.asarray(samples[-self.ring_capacity:], dtype=np.float32)
+        self.ring_filled = min(self.ring_capacity, self.ring_filled + len(samples))
+        gl.glBindBuffer(gl.GL_TEXTURE_BUFFER, self.ring_buffer)
+        while len(samples):
+            count = min(len(samples), self.ring_capacity - self.ring_position)
+            gl.glBufferSubData(gl.GL_TEXTURE_BUFFER, self.ring_position * 4,
+                               count * 4, samples[:count])
+            samples = samples[count:]
+            self.ring_position = (self.ring_position + count) % self.ring_capacity
+
+    def build_ring(self, ecg_data, capacity):
+        """(Re)allocate the ring and seed it from the display data"""
+        gl.glBindBuffer(gl.GL_TEXTURE_BUFFER, self.ring_buffer)
+        gl.glBufferData(gl.GL_TEXTURE_BUFFER, capacity * 4, None, gl.GL_DYNAMIC_DRAW)
+        gl.glBindTexture(gl.GL_TEXTURE_BUFFER, self.ring_texture)
+        gl.glTexBuffer(gl.GL_TEXTURE_BUFFER, gl.GL_R32F, self.ring_buffer)
+        self.ring_capacity = capacity
+        self.ring_position = 0
+        self.ring_filled = 0
+        self.write_ring(ecg_data)
+
+        # Everything but the head is fixed until the next rebuild
+        gl.glUseProgram(self.ring_program)
+        gl.glUniform1i(self.ring_uniforms["samples"], 0)
+        gl.glUniform1i(self.ring_uniforms["capacity"], capacity)
+        gl.glUniform1f(self.ring_uniforms["x_scale"], self.samples_per_pixel)
+        gl.glUniform1f(self.ring_uniforms["y_center"], self.height // 2)
+        gl.glUniform1f(self.ring_uniforms["y_scale"], self.voltage_scale)
+        gl.glUniform2f(self.ring_uniforms["y_range"], 5, self.height - 5)
+        gl.glUniform3f(self.ring_uniforms["color"], *self.ecg_color)
+
+    def draw_ring(self, ecg_data):
+        """Draw the newest ring samples, right-aligned, from gl_VertexID"""
+        capacity = int(self.width / self.samples_per_pixel)
+        if capacity != self.ring_capacity:
+            self.build_ring(ecg_data, capacity)
+
+        count = self.ring_filled
+        gl.glUseProgram(self.ring_program)
+        gl.glUniform1i(self.ring_uniforms["head"],
+                       (self.ring_position - count) % self.ring_capacity)
+        gl.glUniform1f(self.ring_uniforms["x_offset"],
+                       (self.ring_capacity - count) * self.samples_per_pixel)
+
+        gl.glActiveTexture(gl.GL_TEXTURE0)
+        gl.glBindTexture(gl.GL_TEXTURE_BUFFER, self.ring_texture)
+        gl.glBindVertexArray(self.empty_vao)
+        self.set_line_width(2.5)
+        gl.glDrawArrays(gl.GL_LINE_STRIP, 0, count)
+        gl.glUseProgram(self.program)
+
+    def draw_ecg_waveform(self, ecg_data):
+        """Draw the trace in the current display mode"""
+        if self.display_mode in ("sweep", "ring"):
+            if ecg_data is not None and len(ecg_data) >= 2:
+                if self.display_mode == "sweep":
+                    self.draw_sweep(ecg_data)
+                else:
+                    self.draw_ring(ecg_data)
+            return
+        super().draw_ecg_waveform(ecg_data)
+
+    def draw_info_text(self, heart_rate, audio_status):
+        """Draw heart rate and audio status indicators as two quads"""
+        audio_color = (0.0, 1.0, 0.0) if audio_status else (0.5, 0.5, 0.5)
+        top = self.height - 10
+        bottom = self.height - 30
+        quads = []
+        for left, right, color in ((10, 100, (1.0, 0.0, 0.0)), (110, 200, audio_color)):
+            # Two triangles per rectangle
+            xs = [left, right, right, left, right, left]
+            ys = [bottom, bottom, top, bottom, top, top]
+            quads.append(make_vertices(np.column_stack((xs, ys)), color))
+        self.info_buffer.upload(np.concatenate(quads))
+        self.info_buffer.draw(gl.GL_TRIANGLES)
+
+    def render(self, ecg_data, heart_rate, audio_status=True, envelope=None):
+        """Render complete ECG display (envelope as in ECGRenderer.render)"""
+        # The grid pass covers every pixel, so no clear is needed
+        self.draw_grid()
+        if envelope is not None:
+            self.draw_envelope(*envelope)
+        else:
+            self.draw_ecg_waveform(ecg_data)
+        self.draw_info_text(heart_rate, audio_status)
+        gl.glBindVertexArray(0)
+
+    def reset(self):
+        """Forget trace state; sweep and ring are rebuilt on the next draw"""
+        super().reset()
+        self.sweep_size = 0
+        self.ring_capacity = 0
+
+    def resize(self, width, height):
+        """Handle window resize"""
+        self.width = width
+        self.height = height
+        self.reset()
+
+        gl.glViewport(0, 0, width, height)
+        self.update_matrices()
+
+
+# Rendering backends selectable by name
+RENDERERS = {
+    "immediate": ECGRenderer,
+    "shader": ShaderECGRenderer,
+}
@@ -0,0 +1,26 @@
+#version 330 core
+
+uniform vec2 spacing;         // Minor and major line spacing in pixels
+uniform float line_width;     // In pixels
+uniform vec3 background;
+uniform vec3 minor_color;
+uniform vec3 major_color;
+
+out vec4 FragColor;
+
+// Coverage of the nearest grid line (lines at multiples of s, both axes)
+float line_coverage(vec2 coord, float s)
+{
+    vec2 distance = abs(mod(coord + 0.5 * s, s) - 0.5 * s);
+    vec2 coverage = clamp(0.5 * line_width + 0.5 - distance, 0.0, 1.0);
+    return max(coverage.x, coverage.y);
+}
+
+void main()
+{
+    // Pixel centers sit at +0.5; a line at x = n covers pixel column n
+    vec2 coord = gl_FragCoord.xy - 0.5;
+    vec3 color = mix(background, minor_color, line_coverage(coord, spacing.x));
+    color = mix(color, major_color, line_coverage(coord, spacing.y));
+    FragColor = vec4(color, 1.0);
+}
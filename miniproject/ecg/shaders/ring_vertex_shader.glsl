@@ -0,0 +1,27 @@
+#version 330 core
+
+// Trace vertices generated from a ring of samples in a buffer texture.
+// Vertex i draws the i-th oldest visible sample; no vertex attributes.
+uniform samplerBuffer samples;
+uniform int capacity;         // Ring size in samples
+uniform int head;             // Ring index of the oldest visible sample
+uniform float x_offset;       // Pixels before the first vertex
+uniform float x_scale;        // Pixels per sample
+uniform float y_center;
+uniform float y_scale;        // Pixels per mV
+uniform vec2 y_range;         // Clamp range in pixels
+uniform vec3 color;
+
+uniform mat4 projection;
+uniform mat4 view;
+
+out vec3 vertexColor;
+
+void main()
+{
+    float value = texelFetch(samples, (head + gl_VertexID) % capacity).r;
+    float x = x_offset + float(gl_VertexID) * x_scale;
+    float y = clamp(y_center + value * y_scale, y_range.x, y_range.y);
+    gl_Position = projection * view * vec4(x, y, 0.0, 1.0);
+    vertexColor = color;
+}
@@ -0,0 +1,73 @@
+import asyncio
+import numpy as np
+import pytest
+from ingest.protocol import HEADER, encode_packet, decode_header
+from ingest.server import IngestServer, UDPIngestProtocol
+
+
+def deliver(server, packets):
+    """Feed datagrams straight into the UDP protocol and let the drains run"""
+    async def run():
+        protocol = UDPIngestProtocol(server)
+        for packet in packets:
+            protocol.datagram_received(packet, None)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        tasks = [stream.task for stream in server.devices.values()]
+        server.close()
+        return tasks
+    return asyncio.run(run())
+
+
+def block(channels=1, count=10, first=0):
+    return np.tile(np.arange(first, first + count, dtype=np.int16), (channels, 1))
+
+
+def test_late_and_duplicate_packets_are_discarded():
+    server = IngestServer()
+    deliver(server, [encode_packet(1, sequence, block(first=10 * sequence), 250, 1.0)
+                     for sequence in (0, 1, 3, 2, 3, 4)])
+    stream = server.devices[1]
+    assert stream.lost_packets == 1
+    assert stream.reordered_packets == 2
+    assert stream.samples == 40
+    counts = stream.ecg_buffer.counts_view(40)[0]
+    np.testing.assert_array_equal(counts, np.r_[0:20, 30:50])
+
+
+def test_sequence_restart_is_not_lost():
+    server = IngestServer()
+    deliver(server, [encode_packet(1, sequence, block(), 250, 200.0)
+                     for sequence in (1000, 1001, 0, 1)])
+    stream = server.devices[1]
+    assert stream.lost_packets == 0
+    assert stream.restarts == 1
+
+
+def test_sequence_wraps_around():
+    server = IngestServer()
+    deliver(server, [encode_packet(1, sequence, block(), 250, 200.0)
+                     for sequence in (0xFFFFFFFE, 0xFFFFFFFF, 0, 2)])
+    assert server.devices[1].lost_packets == 1
+
+
+def test_layout_change_is_a_bad_packet():
+    server = IngestServer()
+    tasks = deliver(server, [encode_packet(1, 0, block(1), 250, 200.0),
+                             encode_packet(1, 1, block(2), 250, 200.0),
+                             encode_packet(1, 2, block(1), 250, 200.0)])
+    stream = server.devices[1]
+    assert server.bad_packets == 1
+    assert stream.samples == 20
+    assert all(task.cancelled() for task in tasks)
+
+
+@pytest.mark.parametrize("channels, sample_rate", [(0, 250), (1, 0)])
+def test_empty_layout_rejected(channels, sample_rate):
+    packet = HEADER.pack(b"ECGP", 1, channels, sample_rate, 1, 0, 10, 0, 200.0)
+    with pytest.raises(ValueError):
+        decode_header(packet)
+    server = IngestServer()
+    deliver(server, [packet])
+    assert server.bad_packets == 1
+    assert not server.devices
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from data import ECGDataGenerator
+from analysis.pan_tompkins import PanTompkinsDetector
+
+
+def synthetic(heart_rate, seconds, sample_rate=250, seed=0):
+    """Synthetic ECG and the sample positions of its R waves"""
+    generator = ECGDataGenerator(sample_rate, heart_rate=heart_rate, seed=seed)
+    samples = generator.generate_block(int(seconds * sample_rate))
+    beat = 60.0 / heart_rate * sample_rate
+    # The R wave sits at 40% of each beat
+    return samples, np.arange(0.4 * beat, len(samples), beat)
+
+
+@pytest.mark.parametrize("heart_rate", [72, 160, 190])
+def test_detections_land_on_r_waves(heart_rate):
+    samples, r_waves = synthetic(heart_rate, 30)
+    detector = PanTompkinsDetector(250)
+    peaks = np.concatenate([detector.process(samples[i:i + 40])
+                            for i in range(0, len(samples), 40)])
+
+    tolerance = 0.06 * 250
+    assert len(peaks) == np.sum(r_waves > peaks[0] - tolerance)
+    assert np.diff(peaks).min() >= detector.refractory
+    error = np.abs(peaks[:, None] - r_waves[None, :]).min(axis=1)
+    assert error.max() <= tolerance
+
+
+def test_t_waves_rejected_at_high_rate():
+    samples, _ = synthetic(190, 20)
+    detector = PanTompkinsDetector(250)
+    detector.process(samples)
+    rr = np.array(detector.rr_intervals)
+    np.testing.assert_allclose(rr, 60.0 / 190, atol=0.05)
@@ -0,0 +1,51 @@
+import multiprocessing as mp
+import numpy as np
+from producer import SharedRingBuffer, TAIL
+
+
+def write_counter(name, total, seed):
+    """Writer process: publish 0, 1, 2, ... in random block sizes"""
+    ring = SharedRingBuffer(name=name)
+    rng = np.random.default_rng(seed)
+    written = 0
+    while written < total:
+        n = min(int(rng.integers(1, 200)), total - written)
+        ring.extend(np.arange(written, written + n, dtype=np.float32))
+        written += n
+    ring.close()
+
+
+def test_concurrent_reader_sees_every_sample_once_in_order():
+    total = 2_000_000
+    ring = SharedRingBuffer(capacity=500)
+    writer = mp.get_context("spawn").Process(target=write_counter,
+                                             args=(ring.name, total, 0))
+    writer.start()
+
+    chunks = []
+    while writer.is_alive() or ring.published() > int(ring.ints[TAIL]):
+        chunks.append(ring.read_new())
+    writer.join()
+    chunks.append(ring.read_new())
+
+    read = np.concatenate(chunks)
+    # Within a chunk samples are consecutive; between chunks only skips
+    for chunk in chunks:
+        assert np.all(np.diff(chunk) == 1)
+    assert np.all(np.diff(read) >= 1)
+    assert read[-1] == total - 1
+    assert len(read) + ring.overrun() == total
+    ring.close()
+
+
+def test_reader_far_behind_counts_overrun():
+    writer = SharedRingBuffer(capacity=100)
+    reader = SharedRingBuffer(name=writer.name)
+    writer.extend(np.arange(50))
+    assert len(reader.read_new()) == 50
+    writer.extend(np.arange(50, 300))
+    samples = reader.read_new()
+    np.testing.assert_array_equal(samples, np.arange(200, 300))
+    assert reader.overrun() == 150
+    reader.close()
+    writer.close()
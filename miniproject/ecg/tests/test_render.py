@@ -0,0 +1,78 @@
+import ctypes
+import os
+import numpy as np
+import pytest
+
+# Headless rendering through EGL; must be chosen before OpenGL is imported
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+EGL = pytest.importorskip("OpenGL.EGL")
+gl = pytest.importorskip("OpenGL.GL")
+
+from render import ShaderECGRenderer, VERTEX_DTYPE  # noqa: E402
+
+WIDTH, HEIGHT = 1200, 600
+
+
+@pytest.fixture(scope="module")
+def context():
+    """OpenGL 3.3 core context rendering into an offscreen framebuffer"""
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not display or not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        pytest.skip("No EGL display")
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    attributes = [EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+                  EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT, EGL.EGL_NONE]
+    config, count = EGL.EGLConfig(), EGL.EGLint()
+    EGL.eglChooseConfig(display, (EGL.EGLint * len(attributes))(*attributes),
+                        ctypes.pointer(config), 1, ctypes.pointer(count))
+    context_attributes = [EGL.EGL_CONTEXT_MAJOR_VERSION, 3, EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+                          EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK,
+                          EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT, EGL.EGL_NONE]
+    egl_context = EGL.eglCreateContext(
+        display, config, EGL.EGL_NO_CONTEXT,
+        (EGL.EGLint * len(context_attributes))(*context_attributes))
+    if not count.value or not egl_context or not EGL.eglMakeCurrent(
+            display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, egl_context):
+        pytest.skip("No OpenGL 3.3 core context")
+
+    framebuffer = gl.glGenFramebuffers(1)
+    gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, framebuffer)
+    renderbuffer = gl.glGenRenderbuffers(1)
+    gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, renderbuffer)
+    gl.glRenderbufferStorage(gl.GL_RENDERBUFFER, gl.GL_RGBA8, WIDTH, HEIGHT)
+    gl.glFramebufferRenderbuffer(gl.GL_FRAMEBUFFER, gl.GL_COLOR_ATTACHMENT0,
+                                 gl.GL_RENDERBUFFER, renderbuffer)
+    gl.glViewport(0, 0, WIDTH, HEIGHT)
+    yield
+    EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+    EGL.eglDestroyContext(display, egl_context)
+
+
+def sweep_vertices(renderer):
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, renderer.sweep_buffer.vbo)
+    raw = gl.glGetBufferSubData(gl.GL_ARRAY_BUFFER, 0,
+                                renderer.sweep_size * VERTEX_DTYPE.itemsize)
+    return np.frombuffer(raw, dtype=VERTEX_DTYPE)
+
+
+def test_sweep_with_window_wider_than_buffer(context):
+    renderer = ShaderECGRenderer(WIDTH, HEIGHT)
+    renderer.display_mode = "sweep"
+    renderer.samples_per_pixel = 0.5   # 2400 samples across, buffer holds 1000
+    buffer = np.zeros(1000, dtype=np.float32)
+    renderer.render(buffer, 72)
+    assert renderer.sweep_size == len(buffer)
+
+    # New samples advance the sweep instead of rebuilding it every frame
+    for frame in range(10):
+        samples = np.full(4, 1.0, dtype=np.float32)
+        buffer = np.concatenate((buffer[4:], samples))
+        renderer.push_samples(samples)
+        renderer.render(buffer, 72)
+    assert renderer.sweep_position == 40
+    written = sweep_vertices(renderer)["position"][:, 1]
+    assert np.all(written[:40] > HEIGHT // 2)
+    assert np.all(written[40:] == HEIGHT // 2)
+    assert gl.glGetError() == gl.GL_NO_ERROR
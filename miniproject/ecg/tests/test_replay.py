@@ -0,0 +1,37 @@
+import numpy as np
+from recording.replay import WFDBReader, RecordingSource
+
+
+def pack_212(samples):
+    """Pack 12-bit samples two per three bytes; an odd tail takes two bytes"""
+    samples = np.asarray(samples, dtype=np.int64) & 0xFFF
+    out = bytearray()
+    for i in range(0, len(samples), 2):
+        first = int(samples[i])
+        second = int(samples[i + 1]) if i + 1 < len(samples) else 0
+        out += bytes((first & 0xFF, (first >> 8) | ((second >> 4) & 0xF0), second & 0xFF))
+    if len(samples) % 2:
+        out = out[:-1]
+    return bytes(out)
+
+
+def write_record(directory, samples):
+    (directory / "rec.dat").write_bytes(pack_212(samples))
+    (directory / "rec.hea").write_text(
+        f"rec 1 250 {len(samples)}\nrec.dat 212 200 11 0 0 0 0 I\n")
+    return str(directory / "rec.hea")
+
+
+def test_212_odd_sample_count(tmp_path):
+    samples = [0, 100, -100, 2047, -2048]
+    reader = WFDBReader(write_record(tmp_path, samples))
+    assert reader.num_frames == 5
+    np.testing.assert_allclose(reader.read_frames(0, 5), np.array(samples) / 200.0)
+    np.testing.assert_allclose(reader.read_frames(3, 10), np.array(samples[3:]) / 200.0)
+
+
+def test_replay_reaches_end_of_odd_record(tmp_path):
+    samples = np.arange(-250, 251) % 400
+    source = RecordingSource(write_record(tmp_path, samples), loop=False)
+    block = source.generate_block(len(samples) + 100)
+    np.testing.assert_allclose(block, samples / 200.0)
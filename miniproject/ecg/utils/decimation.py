@@ -0,0 +1,88 @@
+import numpy as np
+from utils.ring_buffer import RingBuffer
+
+
+def envelope_vertices(mins, maxs, min_first):
+    """Interleave per-column min/max into x/y vertex arrays"""
+    first = np.where(min_first, mins, maxs)
+    second = np.where(min_first, maxs, mins)
+    y = np.column_stack((first, second)).ravel()
+    x = np.repeat(np.arange(len(mins), dtype=np.float32), 2)
+    x[1::2] += 0.5
+    return x, y
+
+
+class EnvelopeDecimator:
+    def __init__(self, columns, samples_per_column, method="minmax"):
+        """Incremental display decimation over a fixed number of columns
+
+        New samples are folded into whole columns as they arrive, so each
+        push costs O(new samples) and the vertex count never exceeds
+        2 * columns however many samples the window covers.
+
+        method="minmax" keeps each column's min and max; method="lttb"
+        keeps one of those two per column, picked by the largest triangle
+        against the previous pick and the next column's midpoint.
+        """
+        self.columns = columns
+        self.samples_per_column = max(1, int(samples_per_column))
+        self.method = method
+        self.partial = np.empty(0, dtype=np.float32)
+        self.columns_seen = 0
+
+        # Rows: min, max, min-before-max flag
+        self.envelope = RingBuffer(columns, fill=0.0, channels=3)
+
+        # LTTB picks as rows: x offset within column, y
+        self.picks = RingBuffer(columns, fill=0.0, channels=2)
+        self.anchor = (0.0, 0.0)
+        self.pending = None   # Newest column, waiting for its successor
+
+    def push(self, samples):
+        """Fold newly arrived samples into the display columns"""
+        data = np.concatenate((self.partial, np.asarray(samples, dtype=np.float32).ravel()))
+        count = len(data) // self.samples_per_column
+        used = count * self.samples_per_column
+        self.partial = data[used:]
+        if count == 0:
+            return
+
+        buckets = data[:used].reshape(count, self.samples_per_column)
+        mins = buckets.min(axis=1)
+        maxs = buckets.max(axis=1)
+        min_first = buckets.argmin(axis=1) < buckets.argmax(axis=1)
+        self.envelope.extend(np.stack((mins, maxs, min_first)))
+
+        if self.method == "lttb":
+            self._pick_columns(mins, maxs, min_first)
+        self.columns_seen += count
+
+    def _pick_columns(self, mins, maxs, min_first):
+        """Run LTTB selection for new columns only"""
+        column = self.columns_seen
+        for lo, hi, lo_first in zip(mins.tolist(), maxs.tolist(), min_first.tolist()):
+            candidates = ((column, lo), (column + 0.5, hi)) if lo_first else \
+                ((column, hi), (column + 0.5, lo))
+            if self.pending is not None:
+                # Next bucket for the pending column is this one's midpoint
+                cx, cy = column + 0.25, (lo + hi) / 2.0
+                ax, ay = self.anchor
+                best = max(self.pending, key=lambda p: abs(
+                    (ax - cx) * (p[1] - ay) - (ax - p[0]) * (cy - ay)))
+                self.picks.append((best[0] % 1.0, best[1]))
+                self.anchor = best
+            self.pending = candidates
+            column += 1
+
+    def vertices(self):
+        """Current (x, y) vertex arrays, x in column units, oldest first"""
+        if self.method == "lttb":
+            offsets, y = self.picks.view(self.columns - 1)
+            x = np.arange(len(y), dtype=np.float32) + offsets
+            if self.pending is not None:
+                x = np.append(x, len(y) + self.pending[1][0] % 1.0)
+                y = np.append(y, self.pending[1][1])
+            return x, y
+
+        mins, maxs, min_first = self.envelope.view()
+        return envelope_vertices(mins, maxs, min_first > 0.5)
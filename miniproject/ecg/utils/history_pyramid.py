@@ -0,0 +1,120 @@
+import numpy as np
+from utils.ring_buffer import RingBuffer
+
+
+class PyramidLevel:
+    def __init__(self, bucket_samples, capacity):
+        """One tier of min/max buckets, each covering bucket_samples samples"""
+        self.bucket_samples = bucket_samples
+        self.buckets = RingBuffer(capacity, fill=0.0, channels=2)   # Rows: min, max
+        self.partial_min = None
+        self.partial_max = None
+        self.partial_count = 0
+
+    def push(self, mins, maxs, factor):
+        """Fold `factor`-sized groups of lower-level buckets into this level
+
+        Returns the completed (mins, maxs) so the next level can consume them.
+        """
+        if self.partial_count:
+            mins = np.concatenate((self.partial_min, mins))
+            maxs = np.concatenate((self.partial_max, maxs))
+        count = len(mins) // factor
+        used = count * factor
+        self.partial_min, self.partial_max = mins[used:], maxs[used:]
+        self.partial_count = len(mins) - used
+
+        new_mins = mins[:used].reshape(count, factor).min(axis=1)
+        new_maxs = maxs[:used].reshape(count, factor).max(axis=1)
+        if count:
+            self.buckets.extend(np.stack((new_mins, new_maxs)))
+        return new_mins, new_maxs
+
+    def available(self):
+        """Absolute bucket index range [oldest, newest) still held"""
+        total = self.buckets.total_written
+        return max(0, total - self.buckets.capacity), total
+
+    def read(self, first, last):
+        """Read-only (2, last - first) view of buckets [first, last)"""
+        total = self.buckets.total_written
+        return self.buckets.view(total - first)[:, :last - first]
+
+
+class HistoryPyramid:
+    def __init__(self, sample_rate, bucket_seconds=(0.1, 1.0, 10.0, 60.0),
+                 history_seconds=24 * 3600, raw_seconds=60):
+        """Tiered min/max history maintained as samples arrive
+
+        Level 0 holds raw samples for the last raw_seconds; each further
+        level holds min/max buckets of bucket_seconds for history_seconds.
+        Every bucket size must be a whole multiple of the one below. A
+        query picks the finest level that covers the span in a bounded
+        number of buckets, so rendering any span costs the same.
+        The newest, still-filling bucket of each level is not reported.
+        """
+        self.sample_rate = sample_rate
+        self.samples_seen = 0
+        self.levels = [PyramidLevel(1, int(raw_seconds * sample_rate))]
+
+        previous = 1
+        for seconds in bucket_seconds:
+            bucket_samples = int(round(seconds * sample_rate))
+            if bucket_samples % previous:
+                raise ValueError(f"Bucket of {seconds}s is not a multiple of the level below")
+            capacity = int(np.ceil(history_seconds * sample_rate / bucket_samples))
+            self.levels.append(PyramidLevel(bucket_samples, capacity))
+            previous = bucket_samples
+
+    def push(self, samples):
+        """Append new samples and update every level incrementally"""
+        samples = np.asarray(samples, dtype=np.float32).ravel()
+        self.samples_seen += len(samples)
+
+        mins = maxs = samples
+        lower = 1
+        for level in self.levels:
+            mins, maxs = level.push(mins, maxs, level.bucket_samples // lower)
+            lower = level.bucket_samples
+            if len(mins) == 0:
+                break
+
+    def query(self, start_time, end_time, columns, oversample=4):
+        """Min/max per display column over [start_time, end_time) seconds
+
+        Returns (times, mins, maxs) with at most `columns` entries, read
+        from the finest level holding the span in <= oversample * columns
+        buckets (falling back to the coarsest level for very old spans).
+        """
+        start = int(start_time * self.sample_rate)
+        end = int(end_time * self.sample_rate)
+        max_buckets = oversample * columns
+
+        chosen = None
+        for level in self.levels:
+            first = start // level.bucket_samples
+            last = -(-end // level.bucket_samples)
+            oldest, newest = level.available()
+            if last - first <= max_buckets and first >= oldest:
+                chosen = level
+                break
+        if chosen is None:
+            chosen = self.levels[-1]
+
+        oldest, newest = chosen.available()
+        first = max(start // chosen.bucket_samples, oldest)
+        last = min(-(-end // chosen.bucket_samples), newest)
+        if last <= first:
+            empty = np.empty(0, dtype=np.float32)
+            return empty, empty, empty
+
+        mins, maxs = chosen.read(first, last)
+        times = np.arange(first, last) * chosen.bucket_samples / self.sample_rate
+
+        # Merge down to at most `columns` entries
+        if last - first > columns:
+            edges = np.linspace(0, last - first, columns + 1).astype(np.intp)[:-1]
+            mins = np.minimum.reduceat(mins, edges)
+            maxs = np.maximum.reduceat(maxs, edges)
+            times = times[edges]
+        return times, mins, maxs
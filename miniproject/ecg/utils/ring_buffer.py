@@ -0,0 +1,185 @@
+import numpy as np
+
+
+class RingBuffer:
+    def __init__(self, capacity, dtype=np.float32, fill=0.0, channels=None):
+        """Preallocated ring buffer holding the most recent samples
+
+        Storage is mirrored (every sample is written at index i and
+        i + capacity), so the newest samples are always one contiguous
+        slice and reads never copy. With channels set, storage is
+        channel-major (channels, 2 * capacity) and blocks are written as
+        (channels, n) arrays.
+        """
+        self.capacity = int(capacity)
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        shape = (2 * self.capacity,) if channels is None else (channels, 2 * self.capacity)
+        self.data = np.full(shape, fill, dtype=self.dtype)
+        self.head = 0            # Next write position in [0, capacity)
+        self.total_written = 0   # Samples written since creation
+
+    def __len__(self):
+        return self.capacity
+
+    def append(self, sample):
+        """Append a single sample"""
+        self.data[..., self.head] = sample
+        self.data[..., self.head + self.capacity] = sample
+        self.head = (self.head + 1) % self.capacity
+        self.total_written += 1
+
+    def extend(self, samples):
+        """Append a block of samples, (n,) or (channels, n)"""
+        samples = np.asarray(samples, dtype=self.dtype)
+        if self.channels is None:
+            samples = samples.ravel()
+        n = samples.shape[-1]
+        if n == 0:
+            return
+        self.total_written += n
+
+        # Only the last `capacity` samples can survive the write
+        if n > self.capacity:
+            samples = samples[..., -self.capacity:]
+            self.head = (self.head + n - self.capacity) % self.capacity
+            n = self.capacity
+
+        first = min(n, self.capacity - self.head)
+        for offset in (0, self.capacity):
+            start = self.head + offset
+            self.data[..., start:start + first] = samples[..., :first]
+            self.data[..., offset:offset + n - first] = samples[..., first:]
+        self.head = (self.head + n) % self.capacity
+
+    def view(self, n=None):
+        """Read-only view of the newest n samples, oldest first (no copy)"""
+        if n is None or n > self.capacity:
+            n = self.capacity
+        end = self.head + self.capacity
+        view = self.data[..., end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def channel_view(self, channel, n=None):
+        """Read-only view of one channel's newest n samples"""
+        return self.view(n)[channel]
+
+    def slices(self, n=None):
+        """Newest n samples as at most two slices of the primary storage"""
+        if n is None or n > self.capacity:
+            n = self.capacity
+        start = self.head - n
+        if start >= 0:
+            return (self.data[..., start:self.head],)
+        return (self.data[..., self.capacity + start:self.capacity],
+                self.data[..., :self.head])
+
+    def clear(self, fill=0.0):
+        """Reset contents and write position"""
+        self.data.fill(fill)
+        self.head = 0
+        self.total_written = 0
+
+
+class GrowableArray:
+    def __init__(self, dtype, capacity=4096):
+        """Append-only array that doubles its storage when full
+
+        Appends are amortized O(1) and rows() is a view with no copy. With
+        a structured dtype whose `time` field is non-decreasing, between()
+        finds a time range by binary search.
+        """
+        self.records = np.zeros(capacity, dtype=dtype)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, record):
+        """Append one row (a tuple in dtype field order for structured dtypes)"""
+        if self.count == len(self.records):
+            grown = np.zeros(2 * len(self.records), dtype=self.records.dtype)
+            grown[:self.count] = self.records
+            self.records = grown
+        self.records[self.count] = record
+        self.count += 1
+
+    def rows(self):
+        """Read-only view of all rows"""
+        view = self.records[:self.count]
+        view.flags.writeable = False
+        return view
+
+    def latest(self, n=1):
+        """Newest n rows"""
+        return self.rows()[max(0, self.count - n):]
+
+    def between(self, start_time, end_time, field="time"):
+        """Rows with start_time <= field < end_time"""
+        first, last = np.searchsorted(self.records[field][:self.count], (start_time, end_time))
+        return self.rows()[first:last]
+
+
+class ADCRingBuffer(RingBuffer):
+    def __init__(self, capacity, gain=1000.0, baseline=0.0, fill=0.0, channels=None):
+        """Ring buffer storing int16 ADC counts with gain/baseline metadata
+
+        gain is ADC counts per mV and baseline the count that reads 0 mV
+        (WFDB convention); both may be per channel. Blocks are written in
+        mV and quantized on the way in; view() converts back to float32 mV
+        only for the window asked for, counts_view() gives the raw counts.
+        Mirrored int16 storage is 4 bytes per sample: half the float32
+        RingBuffer, a quarter of float64, about 8x under a deque of floats.
+        """
+        self.gain = np.asarray(gain, dtype=np.float32)
+        self.baseline = np.asarray(baseline, dtype=np.float32)
+        if channels is not None:
+            self.gain = np.broadcast_to(self.gain, (channels,))[:, None]
+            self.baseline = np.broadcast_to(self.baseline, (channels,))[:, None]
+        super().__init__(capacity, dtype=np.int16, channels=channels)
+        self.clear(fill)
+
+    def to_counts(self, samples):
+        """Quantize mV values to int16 counts"""
+        counts = np.rint(np.asarray(samples, dtype=np.float32) * self.gain + self.baseline)
+        return np.clip(counts, -32768, 32767).astype(np.int16)
+
+    def clear(self, fill=0.0):
+        """Reset contents to `fill` mV and the write position"""
+        super().clear()
+        self.data[...] = self.to_counts(np.full(self.data.shape, fill, dtype=np.float32))
+
+    def append(self, sample):
+        """Append a single sample (mV), scalar or one value per channel"""
+        super().append(self.to_counts(np.asarray(sample)[..., None])[..., 0])
+
+    def extend(self, samples):
+        """Append a block of samples (mV), (n,) or (channels, n)"""
+        self.extend_counts(self.to_counts(samples))
+
+    def extend_counts(self, counts):
+        """Append a block of raw ADC counts"""
+        super().extend(counts)
+
+    def counts_view(self, n=None):
+        """Read-only view of the newest n raw counts (no copy)"""
+        return super().view(n)
+
+    def view(self, n=None):
+        """Newest n samples converted to float32 mV"""
+        return (super().view(n) - self.baseline) / self.gain
+
+    def channel_view(self, channel, n=None):
+        """One channel's newest n samples converted to float32 mV"""
+        counts = super().view(n)[channel]
+        return (counts - self.baseline[channel]) / self.gain[channel]
+
+
+def create_buffer(capacity, storage="float32", channels=None, gain=1000.0, baseline=0.0):
+    """Display buffer in float32 or int16 ("int16" keeps ADC counts)"""
+    if storage == "int16":
+        return ADCRingBuffer(capacity, gain=gain, baseline=baseline, channels=channels)
+    if storage == "float32":
+        return RingBuffer(capacity, channels=channels)
+    raise ValueError(f"Unsupported storage: {storage}")
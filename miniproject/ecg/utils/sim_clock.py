@@ -0,0 +1,64 @@
+import time
+
+
+class SimulationClock:
+    def __init__(self, sample_rate, max_catchup=0.25, time_source=time.perf_counter):
+        """Convert wall-clock time into a number of samples to produce
+
+        max_catchup (seconds) caps how many samples a single tick may ask
+        for, so a stalled frame (window drag, debugger) does not trigger a
+        huge burst. Samples skipped this way are counted as dropped.
+        """
+        self.sample_rate = sample_rate
+        self.max_catchup_samples = max(1, int(max_catchup * sample_rate))
+        self.time_source = time_source
+
+        self.start_time = None
+        self.last_time = None
+        self.pending = 0.0           # Fractional samples carried to next tick
+        self.samples_produced = 0
+        self.samples_dropped = 0
+
+    def start(self, now=None):
+        """Start (or restart) the clock"""
+        if now is None:
+            now = self.time_source()
+        self.start_time = now
+        self.last_time = now
+        self.pending = 0.0
+        self.samples_produced = 0
+        self.samples_dropped = 0
+
+    def tick(self, now=None):
+        """Return how many samples are due since the previous tick"""
+        if now is None:
+            now = self.time_source()
+        if self.last_time is None:
+            self.start(now)
+            return 0
+
+        elapsed = max(0.0, now - self.last_time)
+        self.last_time = now
+
+        self.pending += elapsed * self.sample_rate
+        n = int(self.pending)
+        self.pending -= n
+
+        if n > self.max_catchup_samples:
+            self.samples_dropped += n - self.max_catchup_samples
+            n = self.max_catchup_samples
+
+        self.samples_produced += n
+        return n
+
+    def simulated_time(self):
+        """Seconds of signal produced since start"""
+        return self.samples_produced / self.sample_rate
+
+    def drift(self, now=None):
+        """Seconds the simulation lags behind the wall clock"""
+        if self.start_time is None:
+            return 0.0
+        if now is None:
+            now = self.time_source()
+        return (now - self.start_time) - self.simulated_time()